@@ -1,13 +1,24 @@
-from collections import deque
+import datetime as dt
+from email.utils import parsedate_to_datetime
 import json
 import os
-from threading import Event
+from queue import Empty
+import random
+from threading import Event, Lock, RLock
+import time
 
-from ScannerApp.utils import isConnected
+from ScannerApp.utils import ConnectivityMonitor
 from ScannerApp.logger import logger
+from ScannerApp.mirror import SheetMirror
+from ScannerApp.queues import MIGRATE_PAGE_SIZE, ItemQueue, JournaledItemQueue
+from ScannerApp.sinks import BaseSink, GSpreadSink
 
 import gspread
+from google.auth.transport.requests import AuthorizedSession, Request
+from google.oauth2.service_account import Credentials
 from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+import requests
+from requests.adapters import HTTPAdapter
 
 # Exceptions
 from http.client import RemoteDisconnected
@@ -34,12 +45,102 @@ CONNECTION_ERRORS = (
 )
 
 API_VERSION = "1.0.0"
+CREDENTIALS_FILE = "credentials.json"
 DEQUE_ITEMS_KEY = "Items"
 DEQUE_DUMP_FILE = "deque_dump.json"
 
-DEFAULT_SLEEP_SECS = 600
 MAX_API_TRIES = 5
 
+# insert_rows items waiting in the queue are coalesced into one API call
+BATCH_MAX_ROWS = 500
+BATCH_WINDOW_SECS = 0.25
+
+# Google Sheets API per-user quotas, in requests per minute
+SHEETS_READ_QUOTA_PER_MIN = 60
+SHEETS_WRITE_QUOTA_PER_MIN = 60
+QUOTA_WARNING_RATIO = 0.8
+
+# quota bucket and number of Sheets API requests each call costs
+API_CALL_COSTS = {
+    "insert_rows": ("write", 1),  # one batchUpdate, see GSpreadSink.insert_rows
+    "delete_row": ("write", 1),
+    "getAccessToSpreadsheet": ("read", 2),  # spreadsheet + worksheet metadata
+    "syncMirror": ("read", 1),  # top rows, or the whole sheet when seeding
+}
+DEFAULT_API_CALL_COST = ("write", 1)
+
+# access tokens are refreshed this long before they expire
+TOKEN_REFRESH_MARGIN_SECS = 300
+HTTP_POOL_SIZE = 4
+# backoff stops growing past this many attempts; 2**n overflows a float at 1024
+MAX_BACKOFF_EXPONENT = 32
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for one class of errors.
+    Attempt n waits a random time between 0 and `base_secs * 2**n`, capped at `cap_secs`.
+    `max_tries` of None retries forever."""
+
+    def __init__(self, base_secs: float, cap_secs: float, max_tries: int = None):
+        self.base_secs = base_secs
+        self.cap_secs = cap_secs
+        self.max_tries = max_tries
+
+    def isExhausted(self, attempt: int) -> bool:
+        return self.max_tries is not None and attempt >= self.max_tries
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        """Returns seconds to wait before retry number `attempt` (starting at 0).
+        A server `retry_after` hint is honored as the minimum wait, up to the cap."""
+        exponent = min(attempt, MAX_BACKOFF_EXPONENT)
+        delay = random.uniform(0, min(self.cap_secs, self.base_secs * 2**exponent))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.cap_secs))
+        return delay
+
+
+RETRY_POLICIES = {
+    "quota": RetryPolicy(base_secs=0.5, cap_secs=120, max_tries=10),
+    "server": RetryPolicy(base_secs=0.25, cap_secs=60, max_tries=8),
+    "auth": RetryPolicy(base_secs=1.0, cap_secs=30, max_tries=3),
+    "client": RetryPolicy(base_secs=1.0, cap_secs=30, max_tries=MAX_API_TRIES),
+    "network": RetryPolicy(base_secs=0.5, cap_secs=60, max_tries=8),
+}
+
+
+def classifyError(e: Exception) -> str:
+    """Returns the `RETRY_POLICIES` key for an API or connection error."""
+    if isinstance(e, gspread.exceptions.APIError):
+        status = getattr(e.response, "status_code", None)
+        if status == 429:
+            return "quota"
+        if status is not None and status >= 500:
+            return "server"
+        if status in (401, 403):
+            # older quota errors come back as 403 rateLimitExceeded
+            if "rate" in str(e).lower() or "quota" in str(e).lower():
+                return "quota"
+            return "auth"
+        return "client"
+    return "network"
+
+
+def getRetryAfter(e: Exception):
+    """Returns the Retry-After header of an API error in seconds, or None if not sent."""
+    response = getattr(e, "response", None)
+    value = getattr(response, "headers", {}).get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - dt.datetime.now(dt.timezone.utc)).total_seconds(), 0.0)
+
 
 class AccessSpreadsheetError(OSError):
     pass
@@ -57,6 +158,153 @@ class JSONEncoderWithFunctions(json.JSONEncoder):
             return json.JSONEncoder.default(self, o)
 
 
+class TokenBucket:
+    """Token bucket holding up to `capacity` tokens, refilled at `rate` tokens per second.
+    A full bucket allows a burst of `capacity` calls. Once less than `soft_ratio` of the
+    bucket is left, calls are spaced out gradually until they reach the refill rate."""
+
+    def __init__(self, rate: float, capacity: float, soft_ratio: float = 0.25):
+        self.rate = rate
+        self.capacity = capacity
+        self.soft_limit = capacity * soft_ratio
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._last_refill) * self.rate
+        )
+        self._last_refill = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Takes `tokens` from the bucket and returns the seconds the caller
+        should wait before making the call. Never blocks."""
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            if self._tokens < 0:
+                return -self._tokens / self.rate
+            if self._tokens < self.soft_limit:
+                return (1 - self._tokens / self.soft_limit) * tokens / self.rate
+            return 0.0
+
+    def usage(self) -> float:
+        """Returns the fraction of the bucket currently used up (0.0 is idle)."""
+        with self._lock:
+            self._refill()
+            return 1 - max(self._tokens, 0) / self.capacity
+
+
+class SheetsRateLimiter:
+    """Keeps gspread calls under the Google Sheets read and write quotas.
+    Every call made by `GSpreadWorker.tryGSpreadCall` reserves its cost here first."""
+
+    def __init__(
+        self,
+        read_per_min: float = SHEETS_READ_QUOTA_PER_MIN,
+        write_per_min: float = SHEETS_WRITE_QUOTA_PER_MIN,
+        warning_ratio: float = QUOTA_WARNING_RATIO,
+    ):
+        self.buckets = {
+            "read": TokenBucket(read_per_min / 60, read_per_min),
+            "write": TokenBucket(write_per_min / 60, write_per_min),
+        }
+        self.warning_ratio = warning_ratio
+        self._warned = {kind: False for kind in self.buckets}
+
+    def reserve(self, func_name: str) -> float:
+        """Reserves quota for a call to `func_name` and returns the seconds to wait before it."""
+        kind, cost = API_CALL_COSTS.get(func_name, DEFAULT_API_CALL_COST)
+        bucket = self.buckets[kind]
+        delay = bucket.reserve(cost)
+
+        usage = bucket.usage()
+        if usage >= self.warning_ratio and not self._warned[kind]:
+            logger.warning(
+                "Sheets %s quota %d%% used. Slowing down API calls.", kind, usage * 100
+            )
+            self._warned[kind] = True
+        elif usage < self.warning_ratio:
+            self._warned[kind] = False
+        return delay
+
+    def quotaUsage(self) -> dict:
+        """Returns the fraction of each quota bucket in use, e.g. {"read": 0.1, "write": 0.9}."""
+        return {kind: bucket.usage() for kind, bucket in self.buckets.items()}
+
+
+class SpreadsheetSession:
+    """Long-lived authorized connection to one spreadsheet, shared by every worker
+    the handler spawns. Keeps one pooled keep-alive HTTP session, refreshes the
+    access token before it expires and caches spreadsheet and worksheet handles,
+    so restarting a worker costs no extra API calls."""
+
+    def __init__(self, spreadsheet_key, credentials_file=CREDENTIALS_FILE):
+        self.spreadsheet_key = spreadsheet_key
+        self.credentials_file = credentials_file
+
+        self.credentials = None
+        self.client = None
+        self._spreadsheet = None
+        self._worksheets = {}
+        self._tokenRequest = Request(requests.Session())
+        self._lock = RLock()
+
+    def _authorize(self):
+        self.credentials = Credentials.from_service_account_file(
+            self.credentials_file, scopes=gspread.auth.DEFAULT_SCOPES
+        )
+        http_session = AuthorizedSession(self.credentials)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+        http_session.mount("https://", adapter)
+        self.client = gspread.Client(auth=self.credentials, session=http_session)
+        self.refreshTokenIfExpiring()
+
+    def refreshTokenIfExpiring(self):
+        """Refreshes the access token if it expires within `TOKEN_REFRESH_MARGIN_SECS`."""
+        with self._lock:
+            creds = self.credentials
+            if creds is None:
+                return
+            # google-auth keeps expiry as a naive UTC datetime
+            expires_in = (
+                (creds.expiry - dt.datetime.utcnow()).total_seconds()
+                if creds.expiry is not None
+                else 0
+            )
+            if not creds.token or expires_in < TOKEN_REFRESH_MARGIN_SECS:
+                creds.refresh(self._tokenRequest)
+
+    def spreadsheet(self):
+        """Returns the cached spreadsheet, authorizing and opening it on first use."""
+        with self._lock:
+            if self.client is None:
+                self._authorize()
+            if self._spreadsheet is None:
+                self._spreadsheet = self.client.open_by_key(self.spreadsheet_key)
+            return self._spreadsheet
+
+    def worksheet(self, sheet_name):
+        """Returns the cached worksheet named `sheet_name`."""
+        spreadsheet = self.spreadsheet()
+        with self._lock:
+            if sheet_name not in self._worksheets:
+                self._worksheets[sheet_name] = spreadsheet.worksheet(sheet_name)
+            return self._worksheets[sheet_name]
+
+    def reset(self):
+        """Drops credentials and cached handles so the next access starts from scratch."""
+        with self._lock:
+            if self.client is not None:
+                self.client.session.close()
+            self.credentials = None
+            self.client = None
+            self._spreadsheet = None
+            self._worksheets = {}
+
+
 class WorkerSignals(QObject):
     """Worker signals"""
 
@@ -64,15 +312,30 @@ class WorkerSignals(QObject):
 
 
 class GSpreadWorker(QObject):
-    """Worker object that checks a deque for items and passes them to the API.
-    To be instantiated by a handler class that adds items to the deque for processing."""
-
-    def __init__(self, deque, spreadsheet_key, sheet_name):
+    """Worker object that waits on an item queue and passes items to the API.
+    To be instantiated by a handler class that adds items to the queue for processing."""
+
+    def __init__(
+        self,
+        queue: ItemQueue,
+        spreadsheet_key,
+        sheet_name,
+        rate_limiter: SheetsRateLimiter = None,
+        connectivity: ConnectivityMonitor = None,
+        session: SpreadsheetSession = None,
+        mirror: SheetMirror = None,
+        sink: BaseSink = None,
+    ):
         super().__init__()
 
         self.signals = WorkerSignals()
 
-        self.deque = deque
+        self.queue = queue
+        self.rate_limiter = rate_limiter or SheetsRateLimiter()
+        self.connectivity = connectivity or ConnectivityMonitor()
+        self.session = session or SpreadsheetSession(spreadsheet_key)
+        self.mirror = mirror or SheetMirror()
+        self.sink = sink  # a GSpreadSink is set once the worksheet is opened
         self.spreadsheet_key = spreadsheet_key
         self.sheet_name = sheet_name
 
@@ -80,19 +343,26 @@ class GSpreadWorker(QObject):
         self._itemFinished = False
         self._timerEvent = Event()
 
-        self.tryGSpreadCall(self.getAccessToSpreadsheet, handler_wait_after=0)
+        self.tryGSpreadCall(self.getAccessToSpreadsheet)
 
-    def getAccessToSpreadsheet(self):
+    def getAccessToSpreadsheet(self, reconnect=False):
         """Uses service account credentials to access the spreadsheet.
-        Sets `self.ss` and `self.sheet` variables for operations."""
+        Sets `self.ss` and `self.sheet` variables for operations.
+        Reuses the handles cached in `self.session` unless `reconnect` is True.
+        Does nothing when the worker writes to a local sink."""
+        if self.usesLocalSink:
+            return
+
         try:
-            gc = gspread.service_account(filename="credentials.json")
-            self.ss = gc.open_by_key(self.spreadsheet_key)
-            self.sheet = self.ss.worksheet(self.sheet_name)
+            if reconnect:
+                self.session.reset()
+            self.ss = self.session.spreadsheet()
+            self.sheet = self.session.worksheet(self.sheet_name)
+            self.sink = GSpreadSink(self.sheet)
             logger.info("Spreadsheet access successful.")
             return
 
-        except (FileNotFoundError, json.decoder.JSONDecodeError):
+        except (FileNotFoundError, ValueError):  # includes JSONDecodeError
             err_str = "Cannot access credentials and/or service account."
 
         except TypeError:
@@ -103,13 +373,25 @@ class GSpreadWorker(QObject):
 
         raise AccessSpreadsheetError(err_str)
 
+    @property
+    def usesLocalSink(self) -> bool:
+        return self.sink is not None and not self.sink.requires_network
+
+    def syncMirror(self):
+        """Checks the worksheet for changes made elsewhere and updates `self.mirror`.
+        Reads the whole worksheet into the mirror if it has not been seeded yet."""
+        if self.mirror.isSeeded:
+            self.mirror.checkForChanges(self.sheet)
+        else:
+            self.mirror.seed(self.sheet)
+
     def getGSpreadFunction(self, func_name: str):
-        """Takes func_name string and returns GSpread method of same name.
+        """Takes func_name string and returns the `self.sink` method of same name.
         If func_name is not found, raises GSpreadFunctionNotFoundError."""
         if func_name == "insert_rows":
-            return self.sheet.insert_rows
+            return self.sink.insert_rows
         elif func_name == "delete_row":
-            return self.sheet.delete_row
+            return self.sink.delete_row
         elif func_name == "getAccessToSpreadsheet":
             return self.getAccessToSpreadsheet
         else:
@@ -123,55 +405,139 @@ class GSpreadWorker(QObject):
         item_copy["function"] = func_ref
         return item_copy
 
+    @staticmethod
+    def isBatchable(item, first_item: dict) -> bool:
+        """Returns True if `item` is an insert_rows item that can be merged with `first_item`.
+        Items are only merged when every argument other than `values` is identical."""
+        if not isinstance(item, dict) or item.get("function") != "insert_rows":
+            return False
+        if not isinstance(item.get("values"), list):
+            return False
+        return {k: v for k, v in item.items() if k != "values"} == {
+            k: v for k, v in first_item.items() if k != "values"
+        }
+
+    def collectBatch(self):
+        """Blocks until the next item is available and takes it from the queue.
+        If it is an insert_rows item, keeps taking queued insert_rows items until
+        `BATCH_MAX_ROWS` rows are collected, a different kind of item is next in line,
+        or `BATCH_WINDOW_SECS` pass. Returns the taken items oldest first.
+        Raises `queue.Empty` if the worker is stopped while waiting
+        or the sheet mirror is due for a change check."""
+        first_item = self.queue.get(
+            timeout=self.mirror.secondsUntilCheck(), cancel_event=self._timerEvent
+        )
+        batch = [first_item]
+        if not self.isBatchable(first_item, first_item):
+            return batch
+
+        row_count = len(first_item["values"])
+        window_end = time.monotonic() + BATCH_WINDOW_SECS
+        while row_count < BATCH_MAX_ROWS and not self._stopIOthread:
+            try:
+                item = self.queue.get(
+                    timeout=max(window_end - time.monotonic(), 0),
+                    cancel_event=self._timerEvent,
+                )
+            except Empty:
+                break
+            if item is None:
+                continue  # invalid scans are never sent
+            if not self.isBatchable(item, first_item):
+                self.queue.putFront([item])
+                break
+            batch.append(item)
+            row_count += len(item["values"])
+        return batch
+
+    @staticmethod
+    def mergeBatch(batch: list):
+        """Merges a list of insert_rows items (oldest first) into a single item.
+        Each insert pushes earlier rows down, so the newest item's rows go on top."""
+        if len(batch) == 1:
+            return batch[0]
+        merged = batch[0].copy()
+        merged["values"] = [row for item in reversed(batch) for row in item["values"]]
+        return merged
+
     def dequeChecker(self):
-        """Looping function that checks deque and pushes items to the handler."""
-        raw_item = None
-        while True:
-            if self.deque:
-                raw_item = self.deque.pop()
-                self._itemFinished = False
+        """Looping function that waits on the queue and pushes items to the handler.
+        Sleeps while the queue is empty and wakes as soon as an item is added or
+        the worker is stopped."""
+        # seeding reads the whole sheet, so it runs here rather than on the GUI thread
+        if (
+            not self._stopIOthread
+            and not self.usesLocalSink
+            and not self.mirror.isSeeded
+        ):
+            self.tryGSpreadCall(self.syncMirror)
+        while not self._stopIOthread:
+            try:
+                raw_items = self.collectBatch()
+            except Empty:
+                if not self._stopIOthread and self.mirror.secondsUntilCheck() == 0:
+                    self.tryGSpreadCall(self.syncMirror)
+                continue
 
-                try:
-                    if raw_item is not None:
-                        item = self.parseDequeItem(raw_item)
-                        self.tryGSpreadCall(**item)
-
-                except TypeError:
-                    logger.warning(
-                        "Item of wrong type added to queue: %s of type %s",
-                        str(raw_item),
-                        type(raw_item),
-                    )
-                    self._itemFinished = True
+            raw_item = self.mergeBatch(raw_items)
+            self._itemFinished = False
 
-                except KeyError:
-                    logger.warning(
-                        f'"function" key not found in deque item: {raw_item}'
-                    )
-                    self._itemFinished = True
+            try:
+                if raw_item is not None:
+                    if len(raw_items) > 1:
+                        logger.info(
+                            "Sending %d queued rows in one batch.",
+                            len(raw_item["values"]),
+                        )
+                    item = self.parseDequeItem(raw_item)
+                    self.tryGSpreadCall(**item)
+                    if self._itemFinished:
+                        self.mirror.applyItem(raw_item)
 
-                except GSpreadFunctionNotFoundError:
-                    logger.warning(
-                        f"GSpread Function reference not found for item: {raw_item}"
-                    )
-                    self._itemFinished = True
+            except TypeError:
+                logger.warning(
+                    "Item of wrong type added to queue: %s of type %s",
+                    str(raw_item),
+                    type(raw_item),
+                )
+                self._itemFinished = True
 
-            if self._stopIOthread:
-                if not self._itemFinished and raw_item is not None:
-                    self.deque.append(raw_item)
-                break
+            except KeyError:
+                logger.warning(f'"function" key not found in queue item: {raw_item}')
+                self._itemFinished = True
 
-            self._wait(0.005)
+            except GSpreadFunctionNotFoundError:
+                logger.warning(
+                    f"GSpread Function reference not found for item: {raw_item}"
+                )
+                self._itemFinished = True
+
+            if raw_item is None:
+                self._itemFinished = True
+
+            if self._itemFinished:
+                self.queue.ack(raw_items)
+            else:
+                # stopped before the call succeeded; oldest item is taken first again
+                self.queue.putFront([i for i in raw_items if i is not None])
 
-    def tryGSpreadCall(self, function, *args, handler_wait_after=4.0, **kwargs):
+    def tryGSpreadCall(self, function, *args, **kwargs):
         """Calls `function` with *args, **kwargs.
         Main method for interacting with spreadsheet or other IO operations.
         Handles exceptions and API errors.
-        Use `handler_wait_after` to define how long to sleep after successful finish."""
-        API_error_count = 0
+        Each attempt first waits for quota from `self.rate_limiter`.
+        Failed attempts are retried with backoff from the matching `RETRY_POLICIES` entry."""
+        error_counts = {}
         while True:
-            if isConnected():
+            if self.usesLocalSink or self.connectivity.isConnected():
+                error_counts.pop("offline", None)
+                if not self.usesLocalSink:
+                    self._wait(self.rate_limiter.reserve(function.__name__))
+                if self._stopIOthread:
+                    break
+
                 try:
+                    self.session.refreshTokenIfExpiring()
                     function(*args, **kwargs)
 
                 except AccessSpreadsheetError:
@@ -181,24 +547,28 @@ class GSpreadWorker(QObject):
                     # TODO: Handle this error better. Maybe with a dialog to close program?
                     self.stop()
 
-                except gspread.exceptions.APIError:
-                    if API_error_count >= MAX_API_TRIES:
+                except (gspread.exceptions.APIError,) + CONNECTION_ERRORS as e:
+                    error_class = classifyError(e)
+                    if error_class == "network":
+                        self.connectivity.invalidate()
+                    policy = RETRY_POLICIES[error_class]
+                    attempt = error_counts.get(error_class, 0)
+                    if policy.isExhausted(attempt):
                         logger.error(
-                            "API error count exceeded maximum tries.", exc_info=True
+                            f"{error_class} error count exceeded maximum tries.",
+                            exc_info=True,
                         )
+                        # the respawned worker re-authorizes and reopens the sheet
+                        self.session.reset()
                         self.stop()
                     else:
-                        API_error_count += 1
-                        logger.warning("API Error. Attempting retry.")
-                        self._wait(DEFAULT_SLEEP_SECS)
-
-                except CONNECTION_ERRORS as e:
-                    logger.warning(
-                        f"Connection Error Raised: {type(e)} {e}. \n%s",
-                        f"Attempting API restart in {DEFAULT_SLEEP_SECS/60} minutes.",
-                    )
-                    self._wait(DEFAULT_SLEEP_SECS)
-                    self.stop()
+                        error_counts[error_class] = attempt + 1
+                        delay = policy.delay(attempt, getRetryAfter(e))
+                        logger.warning(
+                            f"{error_class} error raised: {type(e)} {e}. \n%s",
+                            f"Attempting retry in {delay:.1f} seconds.",
+                        )
+                        self._wait(delay)
 
                 except Exception:
                     logger.error(
@@ -208,15 +578,17 @@ class GSpreadWorker(QObject):
 
                 else:
                     self._itemFinished = True
-                    self._wait(handler_wait_after)  # to not max google api limits
                     return
 
             else:
+                attempt = error_counts.get("offline", 0)
+                error_counts["offline"] = attempt + 1
+                delay = RETRY_POLICIES["network"].delay(attempt)
                 logger.warning(
                     "Cannot reach internet. \n%s",
-                    f"Retrying connection in {DEFAULT_SLEEP_SECS/60} minutes.",
+                    f"Retrying connection in {delay:.1f} seconds.",
                 )
-                self._wait(DEFAULT_SLEEP_SECS)
+                self._wait(delay)
 
             if self._stopIOthread:
                 break
@@ -231,6 +603,7 @@ class GSpreadWorker(QObject):
         finish its current loop and emit the finished signal."""
         self._stopIOthread = True
         self._timerEvent.set()
+        self.queue.wakeAll()
 
     @pyqtSlot()
     def run(self):
@@ -240,14 +613,38 @@ class GSpreadWorker(QObject):
 
 
 class GSpreadAPIHandler(QObject):
-    """Generates thread to interface with GSpread."""
-
-    def __init__(self, spreadsheet_key, sheet_name) -> None:
+    """Generates thread to interface with GSpread.
+    Pass `queue=SQLiteItemQueue()` to keep long outage backlogs on disk instead of in memory.
+    Pass a local `sink` from ScannerApp.sinks to write rows without Google Sheets."""
+
+    def __init__(
+        self,
+        spreadsheet_key,
+        sheet_name,
+        rate_limiter: SheetsRateLimiter = None,
+        queue: ItemQueue = None,
+        connectivity: ConnectivityMonitor = None,
+        session: SpreadsheetSession = None,
+        mirror: SheetMirror = None,
+        sink: BaseSink = None,
+    ) -> None:
         super().__init__()
         self.spreadsheet_key = spreadsheet_key
         self.sheet_name = sheet_name
 
-        self.deque = deque()
+        # pending items are journaled to disk unless another queue is given
+        self.queue = queue if queue is not None else JournaledItemQueue()
+        # shared by every worker so quota use carries over thread restarts
+        self.rate_limiter = rate_limiter or SheetsRateLimiter()
+        # connectivity.connectionChanged reports when the internet drops or returns
+        self.connectivity = connectivity or ConnectivityMonitor()
+        self.sink = sink
+        if sink is None or sink.requires_network:
+            self.connectivity.start()
+        # authorized once and reused by every worker the handler spawns
+        self.session = session or SpreadsheetSession(spreadsheet_key)
+        # local copy of the sheet; read scanned rows from here instead of the API
+        self.mirror = mirror or SheetMirror()
 
         self.isShutDown = False
         self._spawnThread()
@@ -255,19 +652,38 @@ class GSpreadAPIHandler(QObject):
         self._readDequeFromJSON()
 
     def addItem(self, item: dict):
-        """Adds an item to the deque for the worker thread to parse."""
-        self.deque.appendleft(item)
+        """Adds an item to the queue and wakes the worker thread to parse it."""
+        self.queue.put(item)
+
+    def quotaUsage(self) -> dict:
+        """Returns how much of the Sheets read and write quotas is currently in use."""
+        return self.rate_limiter.quotaUsage()
 
     def shutdown(self):
-        """Shuts down API connection thread and saves unsent deque items."""
+        """Shuts down API connection thread and saves unsent queue items."""
         logger.info("Shutting down API connection.")
         self._stopThread()
-        self._dumpDequeToJSON()
+        self.connectivity.stop()
+        if self.sink is not None:
+            self.sink.close()
+        if self.queue.persistent:
+            self.queue.close()
+        else:
+            self._dumpDequeToJSON()
 
     def _spawnThread(self):
         """Subroutine that handles starting a thread with GSpreadWorker"""
         self.thread = QThread()
-        self.worker = GSpreadWorker(self.deque, self.spreadsheet_key, self.sheet_name)
+        self.worker = GSpreadWorker(
+            self.queue,
+            self.spreadsheet_key,
+            self.sheet_name,
+            self.rate_limiter,
+            self.connectivity,
+            self.session,
+            self.mirror,
+            self.sink,
+        )
         self.worker.signals.finished.connect(self.thread.quit)
         self.worker.signals.finished.connect(self.worker.deleteLater)
         self.worker.moveToThread(self.thread)
@@ -291,20 +707,9 @@ class GSpreadAPIHandler(QObject):
             self.thread.wait()
 
     def _dumpDequeToJSON(self):
-        """Dumps all remaining items in the deque to JSON file"""
+        """Dumps all remaining items in the queue to JSON file"""
         data_dict = dict(version=API_VERSION)
-
-        item_list = []
-
-        while True:
-            try:
-                item = self.deque.pop()
-            except IndexError:
-                break
-            else:
-                item_list.append(item)
-
-        data_dict[DEQUE_ITEMS_KEY] = item_list
+        data_dict[DEQUE_ITEMS_KEY] = self.queue.drain()
 
         try:
             with open(DEQUE_DUMP_FILE, "w+") as deque_dump:
@@ -317,17 +722,20 @@ class GSpreadAPIHandler(QObject):
             logger.info("Deque dumped to JSON.")
 
     def _readDequeFromJSON(self):
-        "Gets any deque items from deque_dump.json and puts them into the deque."
+        """Gets any queue items from deque_dump.json and puts them into the queue.
+        Also migrates items dumped by older versions into a persistent queue."""
         try:
             if os.path.exists(DEQUE_DUMP_FILE):
                 with open(DEQUE_DUMP_FILE, "r") as deque_dump:
                     data_dict = json.load(deque_dump)
-                    for item in data_dict[DEQUE_ITEMS_KEY]:
-                        self.addItem(item)
+                    items = data_dict[DEQUE_ITEMS_KEY]
+                    # one transaction per page when the queue is a SQLite outbox
+                    for start in range(0, len(items), MIGRATE_PAGE_SIZE):
+                        self.queue.putMany(items[start : start + MIGRATE_PAGE_SIZE])
                 with open(DEQUE_DUMP_FILE, "w+") as deque_dump:
                     data_dict[DEQUE_ITEMS_KEY] = []  # clear old values
                     json.dump(data_dict, deque_dump, indent=2)
-                logger.info("Read items from deque_dump.json into deque.")
+                logger.info("Read items from deque_dump.json into queue.")
             else:
                 logger.info("No deque_dump.json file found.")
         except PermissionError:
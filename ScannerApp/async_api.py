@@ -0,0 +1,344 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from queue import Empty
+from threading import Event, Thread
+import time
+from typing import Optional
+
+import gspread
+from PyQt5.QtCore import pyqtSignal
+
+from ScannerApp.api import (
+    BATCH_MAX_ROWS,
+    BATCH_WINDOW_SECS,
+    CONNECTION_ERRORS,
+    RETRY_POLICIES,
+    AccessSpreadsheetError,
+    GSpreadAPIHandler,
+    GSpreadFunctionNotFoundError,
+    GSpreadWorker,
+    classifyError,
+    getRetryAfter,
+)
+from ScannerApp.logger import logger
+from ScannerApp.sinks import GSpreadSink
+
+
+MAX_IN_FLIGHT = 4
+UNEXPECTED_ERROR_WAIT_SECS = 60
+
+
+class _SheetLane:
+    """Ordered stream of items for one worksheet. Items in a lane are sent one
+    call at a time because inserts and deletes shift each other's row numbers."""
+
+    def __init__(self):
+        self.items = deque()  # (dispatch order, item) pairs waiting to be sent
+        self.inFlight = []  # pairs taken for the call currently being made
+        self.calling = False
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+
+class AsyncGSpreadAPIHandler(GSpreadAPIHandler):
+    """API handler that runs an asyncio event loop on its own thread instead of a
+    serial GSpreadWorker. Same `addItem` / `shutdown` interface as GSpreadAPIHandler.
+
+    Items are routed to one lane per worksheet (an item's optional "sheet" key, or
+    `sheet_name`). Each lane keeps its items in order and batches inserts like
+    GSpreadWorker does, while lanes for different sheets run concurrently with
+    at most `max_in_flight` blocking gspread calls at once. `itemSent` is emitted
+    from the loop thread and delivered to Qt receivers through their event loop."""
+
+    itemSent = pyqtSignal(dict)
+
+    def __init__(
+        self, spreadsheet_key, sheet_name, max_in_flight=MAX_IN_FLIGHT, **kwargs
+    ):
+        # read by _spawnThread, which the base class calls during __init__
+        self.max_in_flight = max_in_flight
+        super().__init__(spreadsheet_key, sheet_name, **kwargs)
+
+    def _spawnThread(self):
+        """Starts the asyncio loop thread and the dispatcher that feeds the lanes."""
+        self._stopEvent = Event()
+        self._stopping = False
+        self._lanes = {}
+        self._dispatchCount = 0
+        self._callPool = ThreadPoolExecutor(self.max_in_flight, "gspread-call")
+        self._queueReader = ThreadPoolExecutor(1, "gspread-queue")
+
+        self._loop = asyncio.new_event_loop()
+        self.thread = Thread(target=self._runLoop, name="AsyncGSpreadAPIHandler")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _runLoop(self):
+        asyncio.set_event_loop(self._loop)
+        self._inFlight = asyncio.Semaphore(self.max_in_flight)
+        self._dispatcher = self._loop.create_task(self._dispatch())
+        self._mirrorChecker = self._loop.create_task(self._checkMirror())
+        self._route({"function": "getAccessToSpreadsheet"})
+        self._route({"function": "syncMirror"})  # seeds the mirror
+        self._loop.run_forever()
+        self._loop.close()
+
+    def _stopThread(self):
+        """Lets calls in flight finish, returns unsent items to the queue and stops the loop."""
+        logger.info("Stopping AsyncGSpreadAPIHandler loop.")
+        self.isShutDown = True
+        self._stopEvent.set()
+        self.queue.wakeAll()
+        asyncio.run_coroutine_threadsafe(self._stopLanes(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self.thread.join()
+        self._callPool.shutdown()
+        self._queueReader.shutdown()
+
+    async def _stopLanes(self):
+        self._stopping = True
+        self._mirrorChecker.cancel()
+        await self._dispatcher
+        for lane in self._lanes.values():
+            lane.wakeup.set()
+            if not lane.calling:
+                lane.task.cancel()
+        await asyncio.gather(
+            *(lane.task for lane in self._lanes.values()), return_exceptions=True
+        )
+
+        unsent = sorted(
+            pair
+            for lane in self._lanes.values()
+            for pair in lane.inFlight + list(lane.items)
+            if pair[1].get("function") != "syncMirror"
+        )
+        self.queue.putFront([item for _, item in unsent])
+
+    def _lane(self, sheet_name) -> _SheetLane:
+        if sheet_name not in self._lanes:
+            lane = _SheetLane()
+            lane.task = self._loop.create_task(self._runLane(sheet_name, lane))
+            self._lanes[sheet_name] = lane
+        return self._lanes[sheet_name]
+
+    def _route(self, item: dict):
+        self._dispatchCount += 1
+        lane = self._lane(item.get("sheet", self.sheet_name))
+        lane.items.append((self._dispatchCount, item))
+        lane.wakeup.set()
+
+    async def _dispatch(self):
+        """Moves items from the shared queue into their sheet lanes in queue order."""
+        loop = asyncio.get_running_loop()
+        while not self._stopEvent.is_set():
+            try:
+                item = await loop.run_in_executor(
+                    self._queueReader, self.queue.get, None, self._stopEvent
+                )
+            except Empty:
+                continue
+            if item is None:
+                continue  # invalid scans are never sent
+            if self._stopEvent.is_set():
+                self.queue.putFront([item])
+                break
+            if not isinstance(item, dict) or "function" not in item:
+                logger.warning("Malformed item added to queue: %s", item)
+                self.queue.ack([item])
+                continue
+            self._route(item)
+
+    async def _checkMirror(self):
+        """Queues a sheet mirror change check in the main lane whenever one is due."""
+        while True:
+            delay = self.mirror.secondsUntilCheck()
+            if delay is None:
+                delay = self.mirror.delta_check_interval_secs
+            await asyncio.sleep(delay)
+            if self.mirror.secondsUntilCheck() == 0:
+                self._route({"function": "syncMirror"})
+                # don't queue another check until this one has run
+                await asyncio.sleep(self.mirror.delta_check_interval_secs)
+
+    async def _runLane(self, sheet_name, lane: _SheetLane):
+        """Sends a lane's items one call at a time, batching consecutive inserts."""
+        while not self._stopping:
+            if not lane.items:
+                lane.wakeup.clear()
+                await lane.wakeup.wait()
+                continue
+
+            batch = [lane.items.popleft()]
+            # taken items are in inFlight at once so stopping mid-window returns them
+            lane.inFlight = batch
+            first_item = batch[0][1]
+            if GSpreadWorker.isBatchable(first_item, first_item):
+                await self._collectBatch(lane, batch)
+
+            raw_items = [item for _, item in batch]
+            merged = GSpreadWorker.mergeBatch(raw_items)
+            sent = await self._send(sheet_name, merged, lane)
+            if sent is None:
+                return  # stopping; inFlight items go back to the queue
+
+            self.queue.ack(raw_items)
+            lane.inFlight = []
+            if not sent:
+                continue
+            if sheet_name == self.sheet_name:
+                self.mirror.applyItem(merged)
+            if merged["function"] != "syncMirror":
+                self.itemSent.emit(merged)
+
+    async def _collectBatch(self, lane: _SheetLane, batch: list):
+        """Adds the lane's next insert_rows items to `batch`, like
+        GSpreadWorker.collectBatch. Items reach a lane one at a time, so this waits
+        up to `BATCH_WINDOW_SECS` for more, and stops early at `BATCH_MAX_ROWS` rows
+        or when a different kind of item is next in line."""
+        first_item = batch[0][1]
+        row_count = len(first_item["values"])
+        window_end = time.monotonic() + BATCH_WINDOW_SECS
+        while row_count < BATCH_MAX_ROWS and not self._stopping:
+            if not lane.items:
+                remaining = window_end - time.monotonic()
+                if remaining <= 0:
+                    break
+                lane.wakeup.clear()
+                try:
+                    await asyncio.wait_for(lane.wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                continue
+            if not GSpreadWorker.isBatchable(lane.items[0][1], first_item):
+                break
+            batch.append(lane.items.popleft())
+            row_count += len(batch[-1][1]["values"])
+
+    async def _send(self, sheet_name, item: dict, lane: _SheetLane) -> Optional[bool]:
+        """Makes the API call for `item`, retrying with the `RETRY_POLICIES` backoff.
+        Returns True once it succeeded, False if the item is malformed and dropped,
+        like GSpreadWorker does, or None if the handler is stopping before either."""
+        loop = asyncio.get_running_loop()
+        func_name = item["function"]
+        kwargs = {k: v for k, v in item.items() if k not in ("function", "sheet")}
+        error_counts = {}
+        local = self.sink is not None and not self.sink.requires_network
+        while not self._stopping:
+            if not local and not await loop.run_in_executor(
+                None, self.connectivity.isConnected
+            ):
+                attempt = error_counts.get("offline", 0)
+                error_counts["offline"] = attempt + 1
+                await asyncio.sleep(RETRY_POLICIES["network"].delay(attempt))
+                continue
+            error_counts.pop("offline", None)
+            if not local:
+                await asyncio.sleep(self.rate_limiter.reserve(func_name))
+
+            async with self._inFlight:
+                lane.calling = True
+                try:
+                    await loop.run_in_executor(
+                        self._callPool,
+                        partial(self._call, sheet_name, func_name, kwargs),
+                    )
+
+                except GSpreadFunctionNotFoundError:
+                    logger.warning(
+                        f"GSpread Function reference not found for item: {item}"
+                    )
+                    return False
+
+                except (TypeError, KeyError):
+                    # retrying can't fix the item and would block the lane for good
+                    logger.warning(
+                        "Dropping malformed item for %s: %s",
+                        sheet_name,
+                        item,
+                        exc_info=True,
+                    )
+                    return False
+
+                except AccessSpreadsheetError:
+                    logger.error(
+                        "Unexpected error when accessing spreadsheet.", exc_info=True
+                    )
+                    delay = RETRY_POLICIES["auth"].cap_secs
+
+                except (gspread.exceptions.APIError,) + CONNECTION_ERRORS as e:
+                    error_class = classifyError(e)
+                    if error_class == "network":
+                        self.connectivity.invalidate()
+                    policy = RETRY_POLICIES[error_class]
+                    attempt = error_counts.get(error_class, 0)
+                    if policy.isExhausted(attempt):
+                        logger.error(
+                            f"{error_class} error count exceeded maximum tries. Reconnecting.",
+                            exc_info=True,
+                        )
+                        self.session.reset()
+                        error_counts.clear()
+                        delay = policy.cap_secs
+                    else:
+                        error_counts[error_class] = attempt + 1
+                        delay = policy.delay(attempt, getRetryAfter(e))
+                        logger.warning(
+                            f"{error_class} error raised on {sheet_name}: {type(e)} {e}. \n%s",
+                            f"Attempting retry in {delay:.1f} seconds.",
+                        )
+
+                except Exception:
+                    logger.error(
+                        "Unexpected error with AsyncGSpreadAPIHandler call.",
+                        exc_info=True,
+                    )
+                    delay = UNEXPECTED_ERROR_WAIT_SECS
+
+                else:
+                    return True
+
+                finally:
+                    lane.calling = False
+
+            if self._stopping:
+                break
+            await asyncio.sleep(delay)
+        return None
+
+    def _call(self, sheet_name, func_name, kwargs):
+        """Runs one blocking gspread call on a pool thread.
+        A local sink, if set, receives every sheet's rows instead of Google Sheets."""
+        if self.sink is not None and not self.sink.requires_network:
+            sheet = self.sink
+        else:
+            self.session.refreshTokenIfExpiring()
+            sheet = None
+
+        if func_name == "getAccessToSpreadsheet":
+            if sheet is not None:
+                return
+            if kwargs.get("reconnect"):
+                self.session.reset()
+            self.session.worksheet(sheet_name)
+            return
+
+        if func_name == "syncMirror":
+            if sheet is None:
+                worksheet = self.session.worksheet(sheet_name)
+                if self.mirror.isSeeded:
+                    self.mirror.checkForChanges(worksheet)
+                else:
+                    self.mirror.seed(worksheet)
+            return
+
+        if sheet is None:
+            sheet = GSpreadSink(self.session.worksheet(sheet_name))
+        if func_name == "insert_rows":
+            sheet.insert_rows(**kwargs)
+        elif func_name == "delete_row":
+            sheet.delete_row(**kwargs)
+        else:
+            raise GSpreadFunctionNotFoundError("GSpread function name not found.")
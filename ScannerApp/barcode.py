@@ -1,12 +1,25 @@
 from abc import ABC, abstractmethod
+import configparser
 import datetime as dt
 import re
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+
+
+# NAME -> barcode scan class, filled by @registerBarcode in registration order
+BARCODE_CLASSES = {}
+BARCODES_SECTION = "BARCODES"
+# inline flags for the parts of a combined pattern
+INLINE_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"))
 
 
 class BaseBarcodeScan(ABC):
     """Abstract barcode scan object. Barcode scan objects must inherit from this object.
-    This object is not instantiable."""
+    This object is not instantiable.
+
+    Classes registered with @registerBarcode also define NAME, BARCODE_PATTERN and
+    BARCODE_FLAGS, and accept `groups`: the pattern's groups already matched by a
+    BarcodeRegistry, or an empty tuple if nothing matched, so they don't match it
+    again. Without `groups` they match the pattern themselves."""
 
     barcode_str: str
     scanned_datetime: dt.datetime
@@ -31,23 +44,34 @@ class BaseBarcodeScan(ABC):
         pass
 
 
+def registerBarcode(cls):
+    """Class decorator adding a barcode scan class to BARCODE_CLASSES under its NAME."""
+    BARCODE_CLASSES[cls.NAME] = cls
+    return cls
+
+
+@registerBarcode
 class OrganicPrepStandardBarcodeScan(BaseBarcodeScan):
     """Represents an oprep standard barcode scan.
     Includes regular expression validation."""
 
+    NAME = "oprep_standard"
     BARCODE_PATTERN = (
         r"^(pp[0-9]{4,5}|eph[0-9]{4}|[0-9]{4,5})[A-Za-z]{0,2}-([0-9]{5,6}),"
     )
-    compiled_pattern = re.compile(BARCODE_PATTERN, flags=re.IGNORECASE)
+    BARCODE_FLAGS = re.IGNORECASE
+    compiled_pattern = re.compile(BARCODE_PATTERN, flags=BARCODE_FLAGS)
 
-    def __init__(self, barcode_str):
+    def __init__(self, barcode_str, groups: Optional[Tuple[str, ...]] = None):
         super().__init__(barcode_str)
 
-        m = self.compiled_pattern.fullmatch(self.barcode_str)
-        if m:
+        if groups is None:
+            m = self.compiled_pattern.fullmatch(self.barcode_str)
+            groups = m.groups() if m else None
+        if groups:
             self.is_matched = True
-            self.standard_id = m.group(1)
-            self.exp_date_str = self.formatOprepStandardDateGroupString(m.group(2))
+            self.standard_id = groups[0]
+            self.exp_date_str = self.formatOprepStandardDateGroupString(groups[1])
         else:
             self.is_matched = False
 
@@ -82,3 +106,75 @@ class OrganicPrepStandardBarcodeScan(BaseBarcodeScan):
             return {"function": "insert_rows", "values": [[self.barcode_str]]}
         else:
             return None
+
+
+class BarcodeRegistry:
+    """Classifies and parses scans against several barcode formats in one regex pass.
+
+    The patterns of `classes` (NAME -> pattern overrides in `patterns`) are joined
+    into one alternation with a named group per class, tried in the given order.
+    Calling the registry with a barcode string returns an instance of the class
+    whose pattern matched, built from the matched groups, or of `default_cls`
+    (the first class by default) marked as unmatched. It can be passed anywhere
+    a barcode scan class is expected, such as BarcodeScannerApp's barcode_cls."""
+
+    def __init__(self, classes=None, patterns=None, default_cls=None):
+        self.classes = list(classes or BARCODE_CLASSES.values())
+        if not self.classes:
+            raise ValueError("BarcodeRegistry needs at least one barcode class.")
+        self.default_cls = default_cls or self.classes[0]
+        patterns = patterns or {}
+
+        parts = []
+        # group name -> (class, number of the class's group, inner group count)
+        self._dispatch = {}
+        group_count = 0
+        for index, cls in enumerate(self.classes):
+            key = f"_{index}"
+            pattern = patterns.get(cls.NAME) or cls.BARCODE_PATTERN
+            inner_groups = re.compile(pattern, cls.BARCODE_FLAGS).groups
+            # keep named groups of different classes from clashing
+            pattern = re.sub(r"\(\?P([<=])(\w+)", rf"(?P\1{key}_\2", pattern)
+            flags = "".join(c for flag, c in INLINE_FLAGS if cls.BARCODE_FLAGS & flag)
+            if flags:
+                pattern = f"(?{flags}:{pattern})"
+            parts.append(f"(?P<{key}>{pattern})")
+            self._dispatch[key] = (cls, group_count + 1, inner_groups)
+            group_count += inner_groups + 1
+        self.pattern = re.compile("|".join(parts))
+
+    @classmethod
+    def fromConfig(cls, path: str, section: str = BARCODES_SECTION):
+        """Builds a registry from an ini file. Each `name = pattern` line of
+        `section` enables the registered class with that NAME, in order; an empty
+        pattern keeps the class's own. Without the section, every registered class
+        is used and [SETTINGS] barcode_pattern overrides the first one's pattern."""
+        config = configparser.ConfigParser(interpolation=None)
+        if not config.read(path):
+            raise FileNotFoundError(path)
+        if config.has_section(section):
+            unknown = [name for name in config[section] if name not in BARCODE_CLASSES]
+            if unknown:
+                raise KeyError(f"Unknown barcode formats in [{section}]: {unknown}")
+            return cls(
+                [BARCODE_CLASSES[name] for name in config[section]],
+                dict(config[section]),
+            )
+        classes = list(BARCODE_CLASSES.values())
+        pattern = config.get("SETTINGS", "barcode_pattern", fallback=None)
+        return cls(classes, {classes[0].NAME: pattern} if pattern else None)
+
+    def classify(self, barcode_str: str):
+        """Returns the class matching `barcode_str` and its groups, or (None, ())."""
+        m = self.pattern.fullmatch(barcode_str)
+        if m is None:
+            return None, ()
+        cls, number, count = self._dispatch[m.lastgroup]
+        # m.groups()[number] is the first group inside the class's own
+        return cls, m.groups()[number : number + count]
+
+    def __call__(self, barcode_str: str) -> BaseBarcodeScan:
+        cls, groups = self.classify(barcode_str)
+        if cls is None:
+            return self.default_cls(barcode_str, groups=())
+        return cls(barcode_str, groups=groups)
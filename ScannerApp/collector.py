@@ -0,0 +1,229 @@
+from collections import deque
+import hmac
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import ipaddress
+import json
+from queue import Empty
+import socket
+from threading import Event, Lock, Thread
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+import uuid
+
+from ScannerApp.api import RETRY_POLICIES, GSpreadAPIHandler
+from ScannerApp.logger import logger
+from ScannerApp.queues import JournaledItemQueue
+
+
+COLLECTOR_HOST = "127.0.0.1"
+COLLECTOR_PORT = 8765
+COLLECTOR_PATH = "/items"
+STATION_JOURNAL_FILE = "station_journal.jsonl"
+STATION_OUTBOX_FILE = "station_outbox.sqlite3"
+FORWARD_BATCH_SIZE = 200
+FORWARD_TIMEOUT_SECS = 10
+# batch ids remembered by the collector to drop retried duplicates
+SEEN_BATCH_LIMIT = 10000
+
+
+class ScanCollector:
+    """Collector service that several scanning stations push their API items to.
+
+    Items from every station are merged in arrival order into a single
+    GSpreadAPIHandler, so one worker batches, rate limits and writes them all
+    with one set of credentials and one share of quota. Stations send batches
+    over plain HTTP: POST `COLLECTOR_PATH` with {"station", "batch_id", "items"}.
+    By default only this computer can connect. Listening on any other `host`
+    requires a `token`, which stations send in the X-Collector-Token header, since
+    items can delete rows from the sheet.
+    Note that "remove last barcode" deletes whatever row is on top of the
+    shared sheet, which may belong to another station."""
+
+    def __init__(
+        self,
+        spreadsheet_key,
+        sheet_name,
+        host=COLLECTOR_HOST,
+        port=COLLECTOR_PORT,
+        token=None,
+        api=GSpreadAPIHandler,
+    ):
+        if not token and not _isLoopback(host):
+            raise ValueError(f"A token is required to accept stations on {host}.")
+        self.api = api(spreadsheet_key, sheet_name)
+        self.token = token
+
+        self._seenBatches = set()
+        self._seenOrder = deque()
+        self._lock = Lock()
+
+        self.server = ThreadingHTTPServer((host, port), _CollectorRequestHandler)
+        self.server.collector = self
+        self._thread = None
+
+    def start(self):
+        """Starts serving station requests on a background thread."""
+        self._thread = Thread(target=self.server.serve_forever, name="ScanCollector")
+        self._thread.daemon = True
+        self._thread.start()
+        logger.info("Scan collector listening on port %d.", self.server.server_port)
+
+    def receive(self, station: str, batch_id: str, items: list) -> int:
+        """Adds a station's items to the write stream. Returns how many were accepted.
+        A batch id that was already received is acknowledged without adding it again."""
+        with self._lock:
+            if batch_id in self._seenBatches:
+                return 0
+            for item in items:
+                self.api.addItem(item)
+            self._seenBatches.add(batch_id)
+            self._seenOrder.append(batch_id)
+            if len(self._seenOrder) > SEEN_BATCH_LIMIT:
+                self._seenBatches.discard(self._seenOrder.popleft())
+        logger.info("Received %d items from station %s.", len(items), station)
+        return len(items)
+
+    def shutdown(self):
+        """Stops accepting requests and shuts down the API handler."""
+        logger.info("Shutting down scan collector.")
+        self.server.shutdown()
+        self.server.server_close()
+        self.api.shutdown()
+
+
+def _isLoopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class _CollectorRequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        collector = self.server.collector
+        if self.path != COLLECTOR_PATH:
+            self._reply(404, {"error": "not found"})
+            return
+        if collector.token and not hmac.compare_digest(
+            self.headers.get("X-Collector-Token", "").encode(),
+            collector.token.encode(),
+        ):
+            self._reply(403, {"error": "bad token"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length))
+            accepted = collector.receive(
+                str(body["station"]), str(body["batch_id"]), list(body["items"])
+            )
+        except (ValueError, KeyError, TypeError):
+            self._reply(400, {"error": "malformed batch"})
+            return
+        self._reply(200, {"accepted": accepted})
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("Collector request: " + format, *args)
+
+
+class CollectorAPIHandler:
+    """Station-side API handler that sends items to a ScanCollector instead of Google.
+    Same `addItem` / `shutdown` interface as GSpreadAPIHandler. Items are journaled
+    locally first and forwarded in batches by a background thread, so scans made
+    while the collector is unreachable are sent once it comes back."""
+
+    def __init__(
+        self,
+        spreadsheet_key,
+        sheet_name,
+        collector_url=f"http://localhost:{COLLECTOR_PORT}",
+        station=None,
+        token=None,
+        queue=None,
+    ):
+        # the collector owns the spreadsheet; key and sheet are kept for reference
+        self.spreadsheet_key = spreadsheet_key
+        self.sheet_name = sheet_name
+        self.url = collector_url.rstrip("/") + COLLECTOR_PATH
+        self.station = station or socket.gethostname()
+        self.token = token
+        self.queue = (
+            queue if queue is not None else JournaledItemQueue(STATION_JOURNAL_FILE)
+        )
+
+        self._stopEvent = Event()
+        self._thread = Thread(target=self._forwardLoop, name="CollectorForwarder")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def addItem(self, item: dict):
+        """Adds an item to the local queue and wakes the forwarder."""
+        self.queue.put(item)
+
+    def shutdown(self):
+        """Stops forwarding. Unsent items stay in the local journal."""
+        logger.info("Shutting down collector connection.")
+        self._stopEvent.set()
+        self.queue.wakeAll()
+        self._thread.join()
+        self.queue.close()
+
+    def _takeBatch(self) -> list:
+        batch = [self.queue.get(cancel_event=self._stopEvent)]
+        while len(batch) < FORWARD_BATCH_SIZE:
+            try:
+                batch.append(self.queue.get(timeout=0))
+            except Empty:
+                break
+        return batch
+
+    def _post(self, batch_id: str, items: list):
+        body = json.dumps(
+            {"station": self.station, "batch_id": batch_id, "items": items}
+        ).encode()
+        request = Request(self.url, data=body, method="POST")
+        request.add_header("Content-Type", "application/json")
+        if self.token:
+            request.add_header("X-Collector-Token", self.token)
+        with urlopen(request, timeout=FORWARD_TIMEOUT_SECS) as response:
+            response.read()
+
+    def _forwardLoop(self):
+        policy = RETRY_POLICIES["network"]
+        while not self._stopEvent.is_set():
+            try:
+                batch = self._takeBatch()
+            except Empty:
+                continue
+            items = [item for item in batch if item is not None]
+            batch_id = uuid.uuid4().hex  # reused on retry so the collector can dedupe
+            attempt = 0
+            while items:
+                try:
+                    self._post(batch_id, items)
+                except (URLError, OSError) as e:
+                    if isinstance(e, HTTPError) and e.code == 400:
+                        logger.error("Collector rejected batch as malformed: %s", items)
+                        self.queue.ack(items)
+                        break
+                    delay = policy.delay(min(attempt, policy.max_tries))
+                    attempt += 1
+                    logger.warning(
+                        f"Cannot reach collector: {e}. \n%s",
+                        f"Retrying in {delay:.1f} seconds.",
+                    )
+                    if self._stopEvent.wait(delay):
+                        self.queue.putFront(items)
+                        return
+                else:
+                    self.queue.ack(items)
+                    break
@@ -31,7 +31,7 @@ class BarcodeScannerApp:
 
         self.view = view()
         self.view.connectUserInputSlot(self.receiveUserInput)
-        self.view.updateList(self.model.entries)
+        self.view.setHistoryModel(self.model)
 
     def receiveUserInput(self):
         """Slotted function triggered by the view.
@@ -45,15 +45,21 @@ class BarcodeScannerApp:
             self.model.removePreviousEntry()
             self.api.addItem(dict(function="delete_row", index=1))
         elif input_str == "retry connection":
-            self.api.addItem(dict(function="getAccessToSpreadsheet"))
+            self.api.addItem(dict(function="getAccessToSpreadsheet", reconnect=True))
         else:
             new_barcode_scan = self.model.processNewEntry(input_str)
             self.api.addItem(new_barcode_scan.getAPIinfo())
+            standard_id = getattr(new_barcode_scan, "standard_id", None)
+            if standard_id is None:
+                self.view.showUsage(None)
+            else:
+                self.view.showUsage(standard_id, self.model.usageCounts(standard_id))
 
-        self.view.barcodeSubmitted(self.model.entries)
+        self.view.barcodeSubmitted()
 
     def _cleanupRoutine(self) -> None:
         self.api.shutdown()
+        self.model.close()
 
     def show(self):
         self.view.show()
@@ -0,0 +1,109 @@
+from collections import deque
+import datetime as dt
+from typing import Dict, Sequence
+
+from .history import ScanHistoryReader, toEpochMs
+
+
+# local times the lab's shifts start
+SHIFT_STARTS = (dt.time(6), dt.time(14), dt.time(22))
+RECENT_WINDOW = dt.timedelta(hours=1)
+
+
+class UsageCounters:
+    """Rolling per-standard scan counts for the last hour, the current shift and today.
+
+    Scans are added as they happen. Counts are read in amortized O(1): scans that
+    leave the last-hour window are expired from the front of a deque, and the
+    shift and day counts are cleared when their period rolls over."""
+
+    def __init__(
+        self,
+        shift_starts: Sequence[dt.time] = SHIFT_STARTS,
+        window: dt.timedelta = RECENT_WINDOW,
+    ):
+        self.shift_starts = sorted(shift_starts)
+        self.window = window
+        self._reset()
+
+    def _reset(self):
+        self._recent = deque()  # (scanned datetime, standard_id), oldest first
+        self._recentCounts = {}
+        self._shiftCounts = {}
+        self._todayCounts = {}
+        self._shiftEnd = None
+        self._today = None
+
+    def shiftStart(self, now: dt.datetime) -> dt.datetime:
+        """Returns when the shift running at `now` started."""
+        for day in (now.date(), now.date() - dt.timedelta(days=1)):
+            for start in reversed(self.shift_starts):
+                shift_start = dt.datetime.combine(day, start)
+                if shift_start <= now:
+                    return shift_start
+        return dt.datetime.combine(now.date(), dt.time())
+
+    def _nextShiftStart(self, now: dt.datetime) -> dt.datetime:
+        for day in (now.date(), now.date() + dt.timedelta(days=1)):
+            for start in self.shift_starts:
+                shift_start = dt.datetime.combine(day, start)
+                if shift_start > now:
+                    return shift_start
+        return dt.datetime.combine(now.date() + dt.timedelta(days=1), dt.time())
+
+    def _rollOver(self, now: dt.datetime):
+        """Expires scans and periods that ended before `now`."""
+        cutoff = now - self.window
+        while self._recent and self._recent[0][0] < cutoff:
+            _, standard_id = self._recent.popleft()
+            _decrement(self._recentCounts, standard_id)
+        if self._shiftEnd is None or now >= self._shiftEnd:
+            self._shiftCounts.clear()
+            self._shiftEnd = self._nextShiftStart(now)
+        if self._today != now.date():
+            self._todayCounts.clear()
+            self._today = now.date()
+
+    def add(self, standard_id: str, scanned: dt.datetime):
+        """Counts a scan of `standard_id`. Scans must be added in time order."""
+        self._rollOver(scanned)
+        self._recent.append((scanned, standard_id))
+        for counts in (self._recentCounts, self._shiftCounts, self._todayCounts):
+            counts[standard_id] = counts.get(standard_id, 0) + 1
+
+    def counts(self, standard_id: str, now: dt.datetime = None) -> Dict[str, int]:
+        """Returns the scans of `standard_id` in the last hour, this shift and today."""
+        self._rollOver(now or dt.datetime.now())
+        return {
+            "last_hour": self._recentCounts.get(standard_id, 0),
+            "shift": self._shiftCounts.get(standard_id, 0),
+            "today": self._todayCounts.get(standard_id, 0),
+        }
+
+    def rebuild(self, reader: ScanHistoryReader, now: dt.datetime = None):
+        """Recounts from the tail of a scan history store. Only scans since the
+        earliest period start are read, found by bisecting its timestamps."""
+        now = now or dt.datetime.now()
+        since = min(
+            now - self.window,
+            self.shiftStart(now),
+            dt.datetime.combine(now.date(), dt.time()),
+        )
+        self._reset()
+        rows = reader.rowRange(toEpochMs(since), toEpochMs(now))
+        for timestamp_ms, code in zip(
+            reader.timestamps[rows.start : rows.stop],
+            reader.standards[rows.start : rows.stop],
+        ):
+            if code >= 0:
+                scanned = dt.datetime.fromtimestamp(timestamp_ms / 1000)
+                self.add(reader.standard_ids[code], scanned)
+        self._rollOver(now)
+
+
+def _decrement(counts: dict, standard_id: str):
+    count = counts.get(standard_id, 0)
+    if count > 1:
+        counts[standard_id] = count - 1
+    else:
+        counts.pop(standard_id, None)
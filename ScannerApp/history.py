@@ -0,0 +1,220 @@
+"""Columnar binary scan history.
+
+A store is a directory of fixed-width column files, one value per scan, in
+native byte order so they can be memory-mapped as arrays:
+
+    timestamp_ms.i8   int64   scan time, milliseconds since the epoch
+    standard.i4       int32   line number in standards.txt, or NO_VALUE
+    expiry.i4         int32   standard expiry date as YYMMDD, or NO_VALUE
+    standards.txt             interned standard IDs, one per line
+
+Rows are only ever appended. A crash can leave one column a row longer than
+the others, so readers use the shortest column and writers trim to it."""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+import datetime as dt
+import mmap
+import os
+from typing import Dict, Optional
+
+from .scan_log import ScanLogWriter
+
+
+HISTORY_STORE = "scan_history.cols"
+TIMESTAMP_COLUMN = "timestamp_ms.i8"
+STANDARD_COLUMN = "standard.i4"
+EXPIRY_COLUMN = "expiry.i4"
+STANDARDS_FILE = "standards.txt"
+# (file name, array typecode) of every column
+COLUMNS = ((TIMESTAMP_COLUMN, "q"), (STANDARD_COLUMN, "i"), (EXPIRY_COLUMN, "i"))
+NO_VALUE = -1
+
+
+def toEpochMs(datetime: dt.datetime) -> int:
+    """Naive datetimes are taken as local time, like the scan log timestamps."""
+    return int(datetime.timestamp() * 1000)
+
+
+def packExpiry(date_str: Optional[str]) -> int:
+    """Packs an "MM/DD/YY" or "MMDDYY" expiry date into a sortable YYMMDD int.
+    Five digit dates are padded the way OrganicPrepStandardBarcodeScan does."""
+    if not date_str:
+        return NO_VALUE
+    digits = "".join(c for c in date_str if c.isdigit())
+    if len(digits) == 5:
+        digits = digits[:2] + "0" + digits[2:]
+    if len(digits) != 6:
+        return NO_VALUE
+    return int(digits[4:] + digits[:4])
+
+
+def _columnRows(path: str, typecode: str) -> int:
+    try:
+        return os.path.getsize(path) // array(typecode).itemsize
+    except FileNotFoundError:
+        return 0
+
+
+class ScanHistoryStore:
+    """Appends scans to a columnar history store, creating it if needed."""
+
+    def __init__(self, path: str = HISTORY_STORE):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        self.standard_ids = []
+        self._standardIndex = {}
+        standards_path = os.path.join(path, STANDARDS_FILE)
+        if os.path.exists(standards_path):
+            with open(standards_path, "r+b") as standards:
+                data = standards.read()
+                # drop an ID torn by a crash; its rows were never written
+                complete = data.rfind(b"\n") + 1
+                if complete < len(data):
+                    standards.truncate(complete)
+            for standard_id in data[:complete].decode("utf-8").split("\n")[:-1]:
+                self._intern(standard_id)
+        self._standardsFile = open(standards_path, "a", encoding="utf-8")
+
+        # realign columns torn by a crash mid-append
+        rows = min(
+            _columnRows(os.path.join(path, name), typecode)
+            for name, typecode in COLUMNS
+        )
+        self._columnFiles = []
+        for name, typecode in COLUMNS:
+            column = open(os.path.join(path, name), "ab")
+            column.truncate(rows * array(typecode).itemsize)
+            self._columnFiles.append(column)
+        self.rows = rows
+
+    def __len__(self):
+        return self.rows
+
+    def _intern(self, standard_id: str) -> int:
+        index = self._standardIndex.get(standard_id)
+        if index is None:
+            index = len(self.standard_ids)
+            self.standard_ids.append(standard_id)
+            self._standardIndex[standard_id] = index
+        return index
+
+    def append(self, scans: list, fsync: bool = False):
+        """Appends `scans`, a list of (timestamp_ms, standard_id, expiry) tuples.
+        standard_id may be None and expiry is packed with `packExpiry`."""
+        new_standards = []
+        values = [array(typecode) for _, typecode in COLUMNS]
+        for timestamp_ms, standard_id, expiry in scans:
+            if standard_id is None:
+                index = NO_VALUE
+            else:
+                known = len(self.standard_ids)
+                index = self._intern(standard_id)
+                if index == known:
+                    new_standards.append(standard_id)
+            values[0].append(timestamp_ms)
+            values[1].append(index)
+            values[2].append(expiry)
+
+        # standards go first so every written row refers to a stored ID
+        if new_standards:
+            self._standardsFile.write("".join(s + "\n" for s in new_standards))
+            self._standardsFile.flush()
+        for column, column_values in zip(self._columnFiles, values):
+            column_values.tofile(column)
+            column.flush()
+        if fsync:
+            for f in (self._standardsFile, *self._columnFiles):
+                os.fsync(f.fileno())
+        self.rows += len(scans)
+
+    def close(self):
+        self._standardsFile.close()
+        for column in self._columnFiles:
+            column.close()
+
+
+class ScanHistoryWriter(ScanLogWriter):
+    """ScanLogWriter that appends scans to a ScanHistoryStore instead of a text file.
+    `write` takes a (timestamp_ms, standard_id, expiry) tuple, see `scanRecord`."""
+
+    def __init__(self, path: str = HISTORY_STORE, **kwargs):
+        super().__init__(path, **kwargs)
+
+    @staticmethod
+    def scanRecord(item) -> tuple:
+        """Builds the store record of a barcode scan object."""
+        return (
+            toEpochMs(item.scanned_datetime),
+            getattr(item, "standard_id", None),
+            packExpiry(getattr(item, "exp_date_str", None)),
+        )
+
+    def _open(self):
+        return ScanHistoryStore(self.path)
+
+    def _writeTo(self, store, scans: list):
+        store.append(scans, fsync=self.fsync)
+
+
+class ScanHistoryReader:
+    """Read-only view of a ScanHistoryStore with its columns memory-mapped.
+
+    `timestamps`, `standards` and `expiries` are memoryviews of the columns, so
+    nothing is parsed or copied up front. Range lookups bisect the timestamp
+    column, which assumes scans were appended in time order."""
+
+    def __init__(self, path: str = HISTORY_STORE):
+        self.path = path
+        with open(os.path.join(path, STANDARDS_FILE), "r", encoding="utf-8") as f:
+            self.standard_ids = [line.rstrip("\n") for line in f]
+
+        self._maps = []
+        views = []
+        for name, typecode in COLUMNS:
+            with open(os.path.join(path, name), "rb") as column:
+                if os.fstat(column.fileno()).st_size:
+                    mapped = mmap.mmap(column.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._maps.append(mapped)
+                    itemsize = array(typecode).itemsize
+                    usable = len(mapped) - len(mapped) % itemsize
+                    views.append(memoryview(mapped)[:usable].cast(typecode))
+                else:
+                    views.append(memoryview(array(typecode)))
+        self.rows = min(len(view) for view in views)
+        self.timestamps, self.standards, self.expiries = (
+            view[: self.rows] for view in views
+        )
+
+    def __len__(self):
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def rowRange(self, start_ms: int, end_ms: int) -> range:
+        """Rows scanned between `start_ms` and `end_ms`, both inclusive."""
+        return range(
+            bisect_left(self.timestamps, start_ms),
+            bisect_right(self.timestamps, end_ms),
+        )
+
+    def countStandards(self, start_ms: int, end_ms: int) -> Dict[str, int]:
+        """Number of scans of each standard between `start_ms` and `end_ms`,
+        in order of each standard's first scan in the range."""
+        rows = self.rowRange(start_ms, end_ms)
+        counts = Counter(self.standards[rows.start : rows.stop])
+        counts.pop(NO_VALUE, None)
+        return {self.standard_ids[index]: count for index, count in counts.items()}
+
+    def close(self):
+        for view in (self.timestamps, self.standards, self.expiries):
+            view.release()
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
@@ -0,0 +1,114 @@
+from threading import Lock
+import time
+
+from .logger import logger
+
+
+DELTA_CHECK_ROWS = 50
+DELTA_CHECK_INTERVAL_SECS = 300
+FULL_RESYNC_INTERVAL_SECS = 3600
+
+
+def _normalizeRow(row) -> list:
+    """Returns `row` as strings without trailing empty cells, the way the API returns it."""
+    row = ["" if cell is None else str(cell) for cell in row]
+    while row and row[-1] == "":
+        row.pop()
+    return row
+
+
+def _normalizeRows(rows) -> list:
+    rows = [_normalizeRow(row) for row in rows]
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+class SheetMirror:
+    """Local copy of the scan worksheet so reads cost no API quota.
+
+    Seeded with one bulk read, then kept current by applying the worker's own
+    successful insert_rows and delete_row calls. Edits made by other people are
+    caught by `checkForChanges`, which reads only the top `DELTA_CHECK_ROWS` rows
+    (where new scans land) and falls back to a full resync if they differ.
+    Rows below the window are refreshed by a full resync every
+    `FULL_RESYNC_INTERVAL_SECS`."""
+
+    def __init__(
+        self,
+        delta_check_rows: int = DELTA_CHECK_ROWS,
+        delta_check_interval_secs: float = DELTA_CHECK_INTERVAL_SECS,
+        full_resync_interval_secs: float = FULL_RESYNC_INTERVAL_SECS,
+    ):
+        self.delta_check_rows = delta_check_rows
+        self.delta_check_interval_secs = delta_check_interval_secs
+        self.full_resync_interval_secs = full_resync_interval_secs
+
+        self._rows = None
+        self._lastCheck = 0.0
+        self._lastResync = 0.0
+        self._lock = Lock()
+
+    @property
+    def isSeeded(self) -> bool:
+        return self._rows is not None
+
+    def seed(self, sheet):
+        """Replaces the mirror with the full contents of `sheet` (one API read)."""
+        rows = _normalizeRows(sheet.get_all_values())
+        with self._lock:
+            self._rows = rows
+            self._lastCheck = self._lastResync = time.monotonic()
+        logger.info("Sheet mirror synced with %d rows.", len(rows))
+
+    def secondsUntilCheck(self) -> float:
+        """Returns how long until `checkForChanges` is due, or None if not seeded."""
+        if not self.isSeeded:
+            return None
+        return max(
+            self._lastCheck + self.delta_check_interval_secs - time.monotonic(), 0.0
+        )
+
+    def checkForChanges(self, sheet):
+        """Compares the top rows of `sheet` with the mirror and resyncs on a mismatch.
+        Also does a full resync once `full_resync_interval_secs` have passed."""
+        now = time.monotonic()
+        if now - self._lastResync >= self.full_resync_interval_secs:
+            self.seed(sheet)
+            return
+
+        top_rows = _normalizeRows(sheet.get_values(f"1:{self.delta_check_rows}"))
+        with self._lock:
+            expected = _normalizeRows(self._rows[: self.delta_check_rows])
+            self._lastCheck = now
+        if top_rows != expected:
+            logger.info("Sheet changed outside this station. Resyncing mirror.")
+            self.seed(sheet)
+
+    def applyItem(self, item: dict):
+        """Applies a successfully sent queue item to the mirror."""
+        if not self.isSeeded or not isinstance(item, dict):
+            return
+        func_name = item.get("function")
+        with self._lock:
+            if func_name == "insert_rows":
+                row = item.get("row", 1)
+                self._rows[row - 1 : row - 1] = [
+                    _normalizeRow(values) for values in item["values"]
+                ]
+            elif func_name == "delete_row" and item.get("index", 1) <= len(self._rows):
+                del self._rows[item.get("index", 1) - 1]
+
+    def rows(self) -> list:
+        """Returns a copy of every mirrored row, top of the sheet first."""
+        with self._lock:
+            return [list(row) for row in self._rows or []]
+
+    def column(self, col: int = 1) -> list:
+        """Returns the values of column `col` (1-based), top of the sheet first."""
+        with self._lock:
+            return [row[col - 1] if len(row) >= col else "" for row in self._rows or []]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._rows or [])
@@ -1,42 +1,167 @@
+from collections import deque
+import datetime as dt
+from typing import Dict, List, Optional
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
 from .barcode import BaseBarcodeScan
+from .counters import UsageCounters
+from .history import ScanHistoryReader, ScanHistoryWriter
 from .logger import logger
+from .scan_log import ScanLogWriter
 
 
-SCAN_LOG_FILE = "scan_history.log"
+# enough scans to scroll back through a whole shift
+HISTORY_LENGTH = 5000
+COLUMN_HEADERS = ("Standard", "Expires", "Scanned")
 
 
-class ScannerModel:
-    """Main class that manages all internal data processing."""
+class ScannerModel(QAbstractTableModel):
+    """Main class that manages all internal data processing.
+    Also a Qt table model of the scan history, newest scan in row 0, so views
+    get incremental rowsInserted / rowsRemoved signals instead of a full redraw."""
 
-    def __init__(self, barcode_scan_cls: BaseBarcodeScan, list_length: int = 20):
+    def __init__(
+        self,
+        barcode_scan_cls: BaseBarcodeScan,
+        history_length: int = HISTORY_LENGTH,
+        scan_log: ScanLogWriter = None,
+        scan_history: ScanHistoryWriter = None,
+        usage: UsageCounters = None,
+    ):
+        super().__init__()
 
         self.barcode_scan_cls = barcode_scan_cls
+        self.history_length = history_length
+        self.scan_log = scan_log if scan_log is not None else ScanLogWriter()
+        self.scan_history = (
+            scan_history if scan_history is not None else ScanHistoryWriter()
+        )
 
-        # initialize empty list to hold barcodes
-        # UI only displays 10 rows, but keep 20 in case we rotate up
-        self.entries = ["" for _ in range(list_length)]
+        # fixed-capacity ring buffer of scans; _head is the slot of the newest one
+        self._ring = [None] * history_length
+        self._head = -1
+        self._count = 0
+        # standard_id -> its scans still in the ring buffer, oldest first
+        self._recentScans = {}
 
-    def _addNewEntry(self, item: BaseBarcodeScan):
-        """Inserts scan item at beginning of entries list.
-        Can be any object that inherits from BaseBarcodeScan"""
-        self.entries.insert(0, item)
-        self.entries.pop()
-        self._appendScanLog(item.getScannedTimeStamp(), item.barcode_str)
+        self.usage = usage if usage is not None else UsageCounters()
+        self._rebuildUsage()
 
-    @staticmethod
-    def _appendScanLog(*items):
-        """Appends a csv-formatted line to the scan log."""
-        s = ", ".join(items) + "\n"
+    def _rebuildUsage(self):
+        """Recounts usage from the tail of the scan history store, if there is one."""
         try:
-            with open(SCAN_LOG_FILE, "a+") as csv_file:
-                csv_file.write(s)
+            with ScanHistoryReader(self.scan_history.path) as history:
+                self.usage.rebuild(history)
         except FileNotFoundError:
-            logger.info(f"No {SCAN_LOG_FILE} file found.")
-        except PermissionError:
-            logger.info(f"No write permissions for {SCAN_LOG_FILE} file.")
+            logger.info(f"No {self.scan_history.path} store, usage counts start at 0.")
+
+    def usageCounts(self, standard_id: str) -> Dict[str, int]:
+        """Returns the scans of `standard_id` in the last hour, this shift and today.
+        Like scan_counter, removed scans still count since they stay in the history."""
+        return self.usage.counts(standard_id)
+
+    @property
+    def entries(self) -> List[BaseBarcodeScan]:
+        """Scans in the history, newest first."""
+        return [self.entry(row) for row in range(self._count)]
+
+    def entry(self, row: int) -> BaseBarcodeScan:
+        """Returns the scan in `row`, where row 0 is the newest."""
+        if not 0 <= row < self._count:
+            raise IndexError(row)
+        return self._ring[(self._head - row) % self.history_length]
+
+    def recentScans(self, standard_id: str) -> List[BaseBarcodeScan]:
+        """Returns the scans of `standard_id` still in the history, newest first."""
+        return list(reversed(self._recentScans.get(standard_id, ())))
+
+    def lastScanned(self, standard_id: str) -> Optional[dt.datetime]:
+        """Returns when `standard_id` was last scanned, if it is in the history."""
+        scans = self._recentScans.get(standard_id)
+        return scans[-1].scanned_datetime if scans else None
+
+    def scannedWithin(self, standard_id: str, minutes: float) -> bool:
+        """Whether `standard_id` was scanned in the last `minutes` minutes."""
+        last = self.lastScanned(standard_id)
+        return last is not None and dt.datetime.now() - last <= dt.timedelta(
+            minutes=minutes
+        )
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._count
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMN_HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return self.entry(index.row()).getBarcodeView()[index.column()]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return COLUMN_HEADERS[section]
+        return section + 1
+
+    def _addNewEntry(self, item: BaseBarcodeScan):
+        """Inserts scan item at beginning of entries list, dropping the oldest
+        scan once the history is full. Can be any object that inherits from
+        BaseBarcodeScan"""
+        if self._count == self.history_length:
+            last = self._count - 1
+            self.beginRemoveRows(QModelIndex(), last, last)
+            self._unindex(self.entry(last), newest=False)
+            self._count -= 1
+            self.endRemoveRows()
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self._head = (self._head + 1) % self.history_length
+        self._ring[self._head] = item
+        self._count += 1
+        self._index(item)
+        self.endInsertRows()
+        self._appendScanLog(item.getScannedTimeStamp(), item.barcode_str)
+        self.scan_history.write(ScanHistoryWriter.scanRecord(item))
+
+    def _index(self, item: BaseBarcodeScan):
+        standard_id = getattr(item, "standard_id", None)
+        if standard_id is not None:
+            self._recentScans.setdefault(standard_id, deque()).append(item)
+            self.usage.add(standard_id, item.scanned_datetime)
+
+    def _unindex(self, item: BaseBarcodeScan, newest: bool):
+        """Removes `item`, the newest or oldest scan of its standard, from the index."""
+        standard_id = getattr(item, "standard_id", None)
+        scans = self._recentScans.get(standard_id)
+        if not scans:
+            return
+        if newest:
+            scans.pop()
+        else:
+            scans.popleft()
+        if not scans:
+            del self._recentScans[standard_id]
+
+    def _appendScanLog(self, *items):
+        """Queues a csv-formatted line for the scan log writer thread."""
+        self.scan_log.write(", ".join(items) + "\n")
+
+    def close(self):
+        """Writes out the scan log and history. Call before the app exits."""
+        self.scan_log.close()
+        self.scan_history.close()
 
     def removePreviousEntry(self):
-        self.entries.pop(0)
+        if not self._count:
+            return
+        self.beginRemoveRows(QModelIndex(), 0, 0)
+        self._unindex(self._ring[self._head], newest=True)
+        self._ring[self._head] = None
+        self._head = (self._head - 1) % self.history_length
+        self._count -= 1
+        self.endRemoveRows()
 
     def processNewEntry(self, input_str):
         """Returns a new barcode object to submit to the api."""
@@ -0,0 +1,520 @@
+from collections import deque
+import json
+import os
+from queue import Empty
+import sqlite3
+from threading import Condition, Lock, RLock, Timer
+import time
+
+from .logger import logger
+
+
+JOURNAL_FILE = "api_journal.jsonl"
+OUTBOX_FILE = "api_outbox.sqlite3"
+# items moved per transaction when openOutbox migrates a backlog
+MIGRATE_PAGE_SIZE = 500
+
+# SQLiteItemQueue row states
+STATUS_PENDING = 0
+STATUS_DONE = 1
+
+
+class ItemQueue:
+    """Thread-safe FIFO of API items shared between the API handler and its worker.
+    `get` blocks without polling until an item is added or the waiter is cancelled.
+    Items only live in memory; the handler dumps them to JSON at shutdown."""
+
+    persistent = False
+
+    def __init__(self, items=()):
+        self._items = deque()
+        self._notEmpty = Condition()
+        for item in items:
+            self._items.appendleft(item)
+
+    def __len__(self):
+        with self._notEmpty:
+            return len(self._items)
+
+    def put(self, item):
+        """Adds `item` to the back of the queue and wakes a waiting consumer."""
+        with self._notEmpty:
+            self._items.appendleft(item)
+            self._notEmpty.notify()
+
+    def putMany(self, items: list):
+        """Adds `items` (oldest first) to the back of the queue."""
+        for item in items:
+            self.put(item)
+
+    def putFront(self, items: list):
+        """Returns unsent `items` (oldest first) to the front of the queue,
+        so they are the next ones handed out by `get`."""
+        with self._notEmpty:
+            for item in reversed(items):
+                self._items.append(item)
+            self._notEmpty.notify()
+
+    def get(self, timeout=None, cancel_event=None):
+        """Removes and returns the oldest item.
+        Blocks until an item is available, `timeout` seconds pass or `cancel_event`
+        is set and `wakeAll` is called. Raises `queue.Empty` if no item was returned."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._notEmpty:
+            while not self._items:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise Empty
+                if deadline is None:
+                    self._notEmpty.wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Empty
+                    self._notEmpty.wait(remaining)
+            return self._items.pop()
+
+    def drain(self) -> list:
+        """Removes and returns every queued item, oldest first."""
+        with self._notEmpty:
+            items = list(reversed(self._items))
+            self._items.clear()
+            return items
+
+    def wakeAll(self):
+        """Wakes every blocked `get` call so it can re-check its cancel event."""
+        with self._notEmpty:
+            self._notEmpty.notify_all()
+
+    def ack(self, items: list):
+        """Marks `items` taken with `get` as sent. Persistent queues forget them here."""
+        pass
+
+    def close(self):
+        """Releases any resources held by the queue."""
+        pass
+
+
+class JournaledItemQueue(ItemQueue):
+    """ItemQueue backed by an append-only journal file so pending items survive crashes.
+
+    Every `put` appends an add record and every `ack` appends a tombstone record,
+    one JSON object per line. Records are flushed to the OS immediately and fsynced
+    from a timer thread after `fsync_every` records or `fsync_interval_secs`,
+    whichever comes first.
+    Once dead records outnumber pending ones the journal is rewritten with only the
+    pending items, so replay at startup stays proportional to what is still unsent."""
+
+    persistent = True
+
+    def __init__(
+        self,
+        path: str = JOURNAL_FILE,
+        fsync_every: int = 32,
+        fsync_interval_secs: float = 1.0,
+        compact_min_records: int = 1000,
+    ):
+        super().__init__()
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval_secs = fsync_interval_secs
+        self.compact_min_records = compact_min_records
+
+        self._journalLock = RLock()
+        self._pending = {}  # journal sequence number -> item, oldest first
+        self._seqs = {}  # id(item) -> journal sequence number
+        self._nextSeq = 0
+        self._deadRecords = 0
+        self._unsynced = 0
+        self._syncTimer = None
+        self._syncDelay = None
+        self._compactLock = Lock()
+        self._laterRecords = None  # lines written while compact runs, if it does
+
+        self._replay()
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self._deadRecords:
+            self.compact()
+
+    def _replay(self):
+        """Rebuilds pending items from the journal file."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except json.decoder.JSONDecodeError:
+                    # a torn final write from a crash; the item never reached the queue
+                    logger.warning("Skipping corrupted record in %s.", self.path)
+                    self._deadRecords += 1
+                    continue
+                if "add" in record:
+                    self._pending[record["add"]] = record["item"]
+                    self._nextSeq = max(self._nextSeq, record["add"] + 1)
+                elif self._pending.pop(record.get("ack"), None) is not None:
+                    self._deadRecords += 2
+                else:
+                    self._deadRecords += 1
+
+        for seq, item in self._pending.items():
+            self._seqs[id(item)] = seq
+            self._items.appendleft(item)
+        if self._pending:
+            logger.info(
+                "Replayed %d pending items from %s.", len(self._pending), self.path
+            )
+
+    def _writeRecord(self, record: dict):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self._file.write(line)
+        self._file.flush()
+        if self._laterRecords is not None:
+            self._laterRecords.append(line)
+        self._unsynced += 1
+        # fsync runs on the timer thread, never on the caller's (often the GUI) thread
+        if self._unsynced >= self.fsync_every:
+            self._scheduleSync(0)
+        else:
+            self._scheduleSync(self.fsync_interval_secs)
+
+    def _scheduleSync(self, delay_secs: float):
+        """Starts a timer to `sync`, unless one due sooner is already running."""
+        if self._syncTimer is not None:
+            if self._syncDelay <= delay_secs:
+                return
+            self._syncTimer.cancel()
+        self._syncTimer = Timer(delay_secs, self.sync)
+        self._syncTimer.daemon = True
+        self._syncDelay = delay_secs
+        self._syncTimer.start()
+
+    def put(self, item):
+        if item is None:  # invalid scans are never sent, nothing to recover
+            super().put(item)
+            return
+        with self._journalLock:
+            seq = self._nextSeq
+            self._nextSeq += 1
+            self._writeRecord({"add": seq, "item": item})
+            self._pending[seq] = item
+            self._seqs[id(item)] = seq
+            super().put(item)
+
+    def ack(self, items: list):
+        with self._journalLock:
+            for item in items:
+                seq = self._seqs.pop(id(item), None)
+                if seq is None:
+                    continue
+                del self._pending[seq]
+                self._writeRecord({"ack": seq})
+                self._deadRecords += 2
+            compact_due = self._deadRecords >= max(
+                self.compact_min_records, len(self._pending)
+            )
+        # skipped if a compaction is already running; the next ack tries again
+        if compact_due and self._compactLock.acquire(blocking=False):
+            try:
+                self._compact()
+            finally:
+                self._compactLock.release()
+
+    def sync(self):
+        """Forces journal records written so far onto disk.
+        The fsync runs outside the journal lock so `put` and `ack` don't wait on it."""
+        with self._journalLock:
+            if self._syncTimer is not None:
+                self._syncTimer.cancel()
+                self._syncTimer = None
+            if self._file.closed or not self._unsynced:
+                return
+            # a duplicate descriptor stays valid if compact swaps the file meanwhile
+            fd = os.dup(self._file.fileno())
+            self._unsynced = 0
+        try:
+            os.fsync(fd)
+        except OSError as e:
+            logger.warning(f"Cannot sync {self.path}: {e}")
+        finally:
+            os.close(fd)
+
+    def compact(self):
+        """Rewrites the journal with only the pending items.
+        The new file replaces the old one atomically, so a crash keeps one of the two."""
+        with self._compactLock:
+            self._compact()
+
+    def _compact(self):
+        # the snapshot is written and fsynced without the journal lock, so `put`
+        # and `ack` carry on meanwhile; their records are copied over at the swap
+        with self._journalLock:
+            pending = list(self._pending.items())
+            dead_records = self._deadRecords
+            self._laterRecords = []
+        try:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as tmp:
+                for seq, item in pending:
+                    tmp.write(
+                        json.dumps({"add": seq, "item": item}, separators=(",", ":"))
+                        + "\n"
+                    )
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            with self._journalLock:
+                if self._laterRecords:
+                    with open(tmp_path, "a", encoding="utf-8") as tmp:
+                        tmp.writelines(self._laterRecords)
+                self._file.close()
+                os.replace(tmp_path, self.path)
+                self._file = open(self.path, "a", encoding="utf-8")
+                self._deadRecords -= dead_records
+                self._unsynced = len(self._laterRecords)
+                if self._unsynced:
+                    self._scheduleSync(0)
+        finally:
+            with self._journalLock:
+                self._laterRecords = None
+
+    def close(self):
+        """Compacts and closes the journal. Pending items are replayed on next start."""
+        self.compact()
+        self.sync()
+        with self._journalLock:
+            self._file.close()
+
+
+class SQLiteItemQueue(ItemQueue):
+    """ItemQueue stored in a SQLite outbox table so memory use stays flat however
+    many items are waiting, e.g. through a multi-day network outage.
+
+    Only one page of pending rows is held in memory at a time. Acked rows are marked
+    done in a single transaction and purged in bulk every `purge_every` acks."""
+
+    persistent = True
+
+    def __init__(
+        self,
+        path: str = OUTBOX_FILE,
+        page_size: int = 200,
+        purge_every: int = 1000,
+        synchronous: str = "NORMAL",
+    ):
+        super().__init__()
+        self.path = path
+        self.page_size = page_size
+        self.purge_every = purge_every
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "status INTEGER NOT NULL DEFAULT 0, "
+                "item TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS outbox_status_seq ON outbox (status, seq)"
+            )
+
+        # self._items holds (seq, item) pairs of the current page, oldest on the right
+        self._cursor = 0  # highest seq loaded into the page so far
+        self._seqs = {}  # id(item) -> seq for items handed out by get
+        self._ackedSincePurge = 0
+
+        pending = len(self)
+        if pending:
+            logger.info("%d pending items found in %s.", pending, self.path)
+
+    def __len__(self):
+        with self._notEmpty:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status = ?", (STATUS_PENDING,)
+            ).fetchone()[0]
+
+    def _loadPage(self):
+        rows = self._conn.execute(
+            "SELECT seq, item FROM outbox WHERE status = ? AND seq > ? "
+            "ORDER BY seq LIMIT ?",
+            (STATUS_PENDING, self._cursor, self.page_size),
+        ).fetchall()
+        for seq, item_json in rows:
+            self._items.appendleft((seq, json.loads(item_json)))
+            self._cursor = seq
+
+    def put(self, item):
+        if item is None:  # invalid scans are never sent
+            return
+        with self._notEmpty:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO outbox (item) VALUES (?)",
+                    (json.dumps(item, separators=(",", ":")),),
+                )
+            self._notEmpty.notify()
+
+    def putMany(self, items: list):
+        """Adds `items` (oldest first) in a single transaction."""
+        with self._notEmpty:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO outbox (item) VALUES (?)",
+                    [
+                        (json.dumps(item, separators=(",", ":")),)
+                        for item in items
+                        if item is not None
+                    ],
+                )
+            self._notEmpty.notify()
+
+    def putFront(self, items: list):
+        with self._notEmpty:
+            for item in reversed(items):
+                seq = self._seqs.pop(id(item), None)
+                if seq is not None:
+                    self._items.append((seq, item))
+            self._notEmpty.notify()
+
+    def get(self, timeout=None, cancel_event=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._notEmpty:
+            while True:
+                if not self._items:
+                    self._loadPage()
+                if self._items:
+                    break
+                if cancel_event is not None and cancel_event.is_set():
+                    raise Empty
+                if deadline is None:
+                    self._notEmpty.wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Empty
+                    self._notEmpty.wait(remaining)
+            seq, item = self._items.pop()
+            self._seqs[id(item)] = seq
+            return item
+
+    def drain(self) -> list:
+        """Returns every pending item, oldest first.
+        The rows stay in the outbox until they are acked."""
+        with self._notEmpty:
+            self._items.clear()
+            self._seqs.clear()
+            self._cursor = 0
+            return [
+                json.loads(item_json)
+                for (item_json,) in self._conn.execute(
+                    "SELECT item FROM outbox WHERE status = ? ORDER BY seq",
+                    (STATUS_PENDING,),
+                )
+            ]
+
+    def ack(self, items: list):
+        with self._notEmpty:
+            seqs = [self._seqs.pop(id(item), None) for item in items]
+            seqs = [(seq,) for seq in seqs if seq is not None]
+            if not seqs:
+                return
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE outbox SET status = ? WHERE seq = ?",
+                    [(STATUS_DONE, seq) for (seq,) in seqs],
+                )
+            self._ackedSincePurge += len(seqs)
+            if self._ackedSincePurge >= self.purge_every:
+                self.purge()
+
+    def purge(self):
+        """Deletes rows that were already sent."""
+        with self._notEmpty:
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM outbox WHERE status = ?", (STATUS_DONE,)
+                )
+            self._ackedSincePurge = 0
+
+    def close(self):
+        with self._notEmpty:
+            self.purge()
+            self._conn.close()
+
+
+def openOutbox(
+    kind: str = "journal",
+    journal_path: str = JOURNAL_FILE,
+    outbox_path: str = OUTBOX_FILE,
+) -> ItemQueue:
+    """Opens the persistent API item queue selected by `kind`: "journal" for a
+    JournaledItemQueue or "sqlite" for a SQLiteItemQueue, which keeps memory use
+    flat through long outages. Items still pending in the other kind's file are
+    moved over `MIGRATE_PAGE_SIZE` at a time, so switching between the two never
+    strands unsent scans and never loads the whole backlog at once."""
+    if kind == "journal":
+        queue = JournaledItemQueue(journal_path)
+        old_path, pages = outbox_path, _outboxPages
+    elif kind == "sqlite":
+        queue = SQLiteItemQueue(outbox_path)
+        old_path, pages = journal_path, _journalPages
+    else:
+        raise ValueError(f'Unknown outbox "{kind}", use "journal" or "sqlite".')
+
+    if os.path.exists(old_path):
+        moved = 0
+        for items in pages(old_path, MIGRATE_PAGE_SIZE):
+            queue.putMany(items)
+            moved += len(items)
+        for path in (old_path, old_path + "-wal", old_path + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        if moved:
+            logger.info(
+                "Moved %d pending items from %s to %s.", moved, old_path, queue.path
+            )
+    return queue
+
+
+def _journalPages(path: str, page_size: int):
+    """Yields the items still pending in a journal file, `page_size` at a time.
+    Reads the file twice so that only acked sequence numbers are kept in memory."""
+
+    def records():
+        with open(path, "r", encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    yield json.loads(line)
+                except json.decoder.JSONDecodeError:
+                    continue  # a torn final write, see JournaledItemQueue._replay
+
+    acked = {record["ack"] for record in records() if "ack" in record}
+    page = []
+    for record in records():
+        if "add" in record and record["add"] not in acked:
+            page.append(record["item"])
+            if len(page) >= page_size:
+                yield page
+                page = []
+    if page:
+        yield page
+
+
+def _outboxPages(path: str, page_size: int):
+    """Yields the items still pending in a SQLite outbox, `page_size` at a time."""
+    conn = sqlite3.connect(path)
+    try:
+        last_seq = 0
+        while True:
+            rows = conn.execute(
+                "SELECT seq, item FROM outbox WHERE status = ? AND seq > ? "
+                "ORDER BY seq LIMIT ?",
+                (STATUS_PENDING, last_seq, page_size),
+            ).fetchall()
+            if not rows:
+                break
+            last_seq = rows[-1][0]
+            yield [json.loads(item_json) for _, item_json in rows]
+    finally:
+        conn.close()
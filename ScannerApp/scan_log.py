@@ -0,0 +1,265 @@
+import datetime as dt
+import os
+from threading import Condition, Thread
+from typing import List, Optional, Tuple
+
+from .logger import logger
+
+
+SCAN_LOG_FILE = "scan_history.log"
+INDEX_SUFFIX = ".idx"
+
+
+def hourKey(line) -> Optional[int]:
+    """Returns the hour of a "MM/DD/YY HH:MM, barcode" line as a sortable
+    YYMMDDHH int, or None if the line does not start with a timestamp."""
+    head = line[:11]
+    if isinstance(head, bytes):
+        head = head.decode("ascii", "replace")
+    if len(head) != 11 or head[2] != "/" or head[5] != "/" or head[8] != " ":
+        return None
+    digits = head[6:8] + head[0:2] + head[3:5] + head[9:11]
+    return int(digits) if digits.isdigit() else None
+
+
+def datetimeHourKey(datetime: dt.datetime) -> int:
+    return int(datetime.strftime("%y%m%d%H"))
+
+
+class ScanLogIndex:
+    """Sparse time index of the scan log, kept in a sidecar file next to it.
+
+    Each "YYMMDDHH offset" line marks the byte offset where a run of log lines
+    from one hour starts, so the runs for a time range can be read with a seek
+    instead of scanning the whole log. Lines are normally in time order, but a
+    clock change only starts another run, it never makes the index wrong."""
+
+    def __init__(self, log_path: str = SCAN_LOG_FILE, index_path: str = None):
+        self.log_path = log_path
+        self.index_path = index_path or log_path + INDEX_SUFFIX
+        self.keys = []
+        self.offsets = []
+        self._load()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r") as index:
+                for line in index:
+                    try:
+                        key, offset = (int(field) for field in line.split())
+                    except ValueError:
+                        # torn final write; catchUp re-indexes from the last good run
+                        logger.warning("Ignoring corrupted %s.", self.index_path)
+                        self._rewrite()
+                        break
+                    self.keys.append(key)
+                    self.offsets.append(offset)
+        except FileNotFoundError:
+            pass
+
+    def _rewrite(self):
+        try:
+            with open(self.index_path, "w") as index:
+                index.writelines(f"{k} {o}\n" for k, o in zip(self.keys, self.offsets))
+        except OSError as e:
+            logger.warning(f"Cannot write {self.index_path}: {e}")
+
+    def lastKey(self) -> Optional[int]:
+        """Hour key of the run at the end of the log."""
+        return self.keys[-1] if self.keys else None
+
+    def add(self, runs: List[Tuple[int, int]]):
+        """Records runs, as (hour key, byte offset) pairs, appended to the log."""
+        if not runs:
+            return
+        for key, offset in runs:
+            self.keys.append(key)
+            self.offsets.append(offset)
+        try:
+            with open(self.index_path, "a") as index:
+                index.writelines(f"{key} {offset}\n" for key, offset in runs)
+        except OSError as e:
+            logger.warning(f"Cannot write {self.index_path}: {e}")
+
+    def catchUp(self):
+        """Indexes log lines appended since the index was last written, and
+        rebuilds the index if the log was truncated or replaced."""
+        try:
+            log = open(self.log_path, "rb")
+        except FileNotFoundError:
+            log = None
+        if log is None:
+            if self.keys:
+                self.keys, self.offsets = [], []
+                self._rewrite()
+            return
+        with log:
+            if self.keys:
+                log.seek(self.offsets[-1])
+                if hourKey(log.readline()) != self.keys[-1]:
+                    logger.info("Rebuilding %s for a new log.", self.index_path)
+                    self.keys, self.offsets = [], []
+                    self._rewrite()
+            start = self.offsets[-1] if self.offsets else 0
+            last_key = self.lastKey()
+            log.seek(start)
+            runs = []
+            position = start
+            for line in log:
+                key = hourKey(line)
+                if key is not None and key != last_key:
+                    runs.append((key, position))
+                    last_key = key
+                position += len(line)
+        self.add(runs)
+
+    def segments(self, start_key: int, end_key: int) -> List[Tuple[int, int]]:
+        """Byte ranges of the log holding every line from hour `start_key` to
+        `end_key`, in file order. The stop of the last run is None, meaning EOF."""
+        segments = []
+        for i, key in enumerate(self.keys):
+            if not start_key <= key <= end_key:
+                continue
+            start = self.offsets[i]
+            stop = self.offsets[i + 1] if i + 1 < len(self.offsets) else None
+            if segments and segments[-1][1] == start:
+                segments[-1] = (segments[-1][0], stop)
+            else:
+                segments.append((start, stop))
+        return segments
+
+
+class ScanLogWriter:
+    """Appends lines to the scan log from a background thread.
+
+    `write` only adds the line to an in-memory buffer, so the GUI thread never
+    waits on the disk. The writer thread keeps the file open and writes the
+    buffer in order once it holds `flush_lines` lines, every `flush_interval_secs`
+    and at `close`. With `fsync` the lines are also forced onto disk at each flush.
+    If the file cannot be written, lines are kept and retried at the next flush;
+    past `max_pending` buffered lines new ones are dropped and logged instead."""
+
+    def __init__(
+        self,
+        path: str = SCAN_LOG_FILE,
+        flush_lines: int = 64,
+        flush_interval_secs: float = 1.0,
+        fsync: bool = False,
+        max_pending: int = 100000,
+        index: bool = True,
+    ):
+        self.path = path
+        self.flush_lines = flush_lines
+        self.flush_interval_secs = flush_interval_secs
+        self.fsync = fsync
+        self.max_pending = max_pending
+        self.index = index
+
+        self._lines = []
+        self._dropped = 0
+        self._closed = False
+        self._file = None
+        self._index = None
+        self._changed = Condition()
+
+        self._thread = Thread(target=self._run, name="ScanLogWriter")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, line: str):
+        """Buffers `line` for the writer thread. Never blocks on IO."""
+        with self._changed:
+            if self._closed:
+                logger.warning("Scan log is closed, dropping: %s", str(line).rstrip())
+                return
+            if len(self._lines) >= self.max_pending:
+                self._dropped += 1
+                logger.error("Scan log buffer full, dropping: %s", str(line).rstrip())
+                return
+            self._lines.append(line)
+            if len(self._lines) >= self.flush_lines:
+                self._changed.notify()
+
+    def flush(self):
+        """Wakes the writer thread to write buffered lines now."""
+        with self._changed:
+            self._changed.notify()
+
+    def close(self):
+        """Writes every buffered line and stops the writer thread."""
+        with self._changed:
+            if self._closed:
+                return
+            self._closed = True
+            self._changed.notify()
+        self._thread.join()
+
+    def _run(self):
+        failed = False
+        while True:
+            with self._changed:
+                if not self._closed and (failed or len(self._lines) < self.flush_lines):
+                    self._changed.wait(self.flush_interval_secs)
+                lines, self._lines = self._lines, []
+                closing = self._closed
+            failed = bool(lines) and not self._writeLines(lines)
+            if closing:
+                if failed:
+                    logger.error(
+                        "Scan log closed with %d unwritten lines: %s", len(lines), lines
+                    )
+                break
+            if failed:
+                with self._changed:
+                    # keep the order: failed lines go in front of newer ones
+                    self._lines[:0] = lines
+        if self._file is not None:
+            self._file.close()
+
+    def _writeLines(self, lines: list) -> bool:
+        try:
+            if self._file is None:
+                self._file = self._open()
+            self._writeTo(self._file, lines)
+        except FileNotFoundError:
+            logger.info(f"No {self.path} file found.")
+        except PermissionError:
+            logger.info(f"No write permissions for {self.path} file.")
+        except OSError as e:
+            logger.warning(f"Cannot write to {self.path}: {e}")
+        else:
+            return True
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        return False
+
+    def _open(self):
+        """Opens the destination. Subclasses writing other formats override this
+        and `_writeTo`; the returned object only needs a `close` method."""
+        if self.index:
+            self._index = ScanLogIndex(self.path)
+            self._index.catchUp()
+        return open(self.path, "a+")
+
+    def _writeTo(self, file, lines: list):
+        if self._index is None:
+            file.write("".join(lines))
+        else:
+            runs = []
+            last_key = self._index.lastKey()
+            for line in lines:
+                key = hourKey(line)
+                if key is not None and key != last_key:
+                    file.flush()
+                    runs.append((key, file.tell()))
+                    last_key = key
+                file.write(line)
+        file.flush()
+        if self.fsync:
+            os.fsync(file.fileno())
+        if self._index is not None:
+            self._index.add(runs)
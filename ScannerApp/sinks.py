@@ -0,0 +1,266 @@
+from abc import ABC, abstractmethod
+import csv
+import datetime as dt
+import sqlite3
+from threading import Lock
+import time
+from typing import List, Optional
+
+
+SINK_CSV_FILE = "sheet_rows.csv"
+SINK_SQLITE_FILE = "sheet_rows.sqlite3"
+
+
+class BaseSink(ABC):
+    """Destination for the rows GSpreadWorker sends. Sink objects must inherit from
+    this object. Mirrors the two worksheet methods the app uses, where row 1 is
+    the top of the sheet and new scans are inserted above older ones."""
+
+    # local sinks skip the connectivity check, rate limiter and spreadsheet access
+    requires_network = False
+
+    def __init__(self):
+        self.calls = 0
+        self.rows_written = 0
+
+    @abstractmethod
+    def insert_rows(self, values: List[List], row: int = 1, **kwargs):
+        """Inserts `values` so the first of them becomes row number `row`."""
+        pass
+
+    @abstractmethod
+    def delete_row(self, index: int):
+        """Deletes row number `index`."""
+        pass
+
+    def close(self):
+        """Releases any files or connections held by the sink."""
+        pass
+
+
+def _cellValue(value) -> dict:
+    """Returns the Sheets API ExtendedValue that stores `value` as is, like RAW input."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, (int, float)):
+        return {"numberValue": value}
+    return {"stringValue": str(value)}
+
+
+class GSpreadSink(BaseSink):
+    """Sends rows to a gspread worksheet. Used by GSpreadWorker unless a local sink is set."""
+
+    requires_network = True
+
+    def __init__(self, worksheet):
+        super().__init__()
+        self.worksheet = worksheet
+
+    def insert_rows(
+        self, values, row=1, value_input_option="RAW", inherit_from_before=False
+    ):
+        """Inserts the rows and their values in one batchUpdate request.
+        gspread's own insert_rows makes a second request for the values, so a retry
+        after that one failed would insert the rows again and leave blank rows."""
+        if value_input_option != "RAW":
+            raise ValueError("GSpreadSink can only write RAW values.")
+        sheet_id = self.worksheet.id
+        requests = []
+        width = max((len(values_row) for values_row in values), default=0)
+        if width > self.worksheet.col_count:
+            requests.append(
+                {
+                    "appendDimension": {
+                        "sheetId": sheet_id,
+                        "dimension": "COLUMNS",
+                        "length": width - self.worksheet.col_count,
+                    }
+                }
+            )
+        requests.append(
+            {
+                "insertDimension": {
+                    "range": {
+                        "sheetId": sheet_id,
+                        "dimension": "ROWS",
+                        "startIndex": row - 1,
+                        "endIndex": row - 1 + len(values),
+                    },
+                    "inheritFromBefore": inherit_from_before,
+                }
+            }
+        )
+        requests.append(
+            {
+                "updateCells": {
+                    "start": {
+                        "sheetId": sheet_id,
+                        "rowIndex": row - 1,
+                        "columnIndex": 0,
+                    },
+                    "rows": [
+                        {
+                            "values": [
+                                {}
+                                if value is None
+                                else {"userEnteredValue": _cellValue(value)}
+                                for value in values_row
+                            ]
+                        }
+                        for values_row in values
+                    ],
+                    "fields": "userEnteredValue",
+                }
+            }
+        )
+        self.worksheet.spreadsheet.batch_update({"requests": requests})
+        # keep gspread's cached sheet size in step, as its insert_rows does
+        grid = self.worksheet._properties["gridProperties"]
+        grid["rowCount"] += len(values)
+        grid["columnCount"] = max(grid["columnCount"], width)
+        self.calls += 1
+        self.rows_written += len(values)
+
+    def delete_row(self, index):
+        self.worksheet.delete_row(index)
+        self.calls += 1
+
+
+class NullSink(BaseSink):
+    """Discards rows. Measures the pipeline without any IO."""
+
+    def insert_rows(self, values, row=1, **kwargs):
+        self.calls += 1
+        self.rows_written += len(values)
+
+    def delete_row(self, index):
+        self.calls += 1
+
+
+class MemorySheetSink(BaseSink):
+    """Keeps rows in a list that behaves like a worksheet.
+    `commit_times` records when each cell value was first stored (time.monotonic),
+    so scan to commit latency can be measured without a network."""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.commit_times = {}
+        self._lock = Lock()
+
+    def insert_rows(self, values, row=1, **kwargs):
+        with self._lock:
+            self.rows[row - 1 : row - 1] = [list(values_row) for values_row in values]
+            now = time.monotonic()
+            for values_row in values:
+                for cell in values_row:
+                    self.commit_times.setdefault(cell, now)
+            self.calls += 1
+            self.rows_written += len(values)
+
+    def delete_row(self, index):
+        with self._lock:
+            if index <= len(self.rows):
+                del self.rows[index - 1]
+            self.calls += 1
+
+
+class CSVSink(BaseSink):
+    """Appends every operation to a CSV file as "timestamp, operation, cells...".
+    Rows are never rewritten, so a delete is recorded rather than applied."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._file = open(path, "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+
+    def insert_rows(self, values, row=1, **kwargs):
+        timestamp = dt.datetime.now().isoformat(timespec="milliseconds")
+        # inserting at the top puts values[0] highest, so oldest-first is reversed
+        self._writer.writerows(
+            [timestamp, "insert_row", *values_row] for values_row in reversed(values)
+        )
+        self._file.flush()
+        self.calls += 1
+        self.rows_written += len(values)
+
+    def delete_row(self, index):
+        timestamp = dt.datetime.now().isoformat(timespec="milliseconds")
+        self._writer.writerow([timestamp, "delete_row", index])
+        self._file.flush()
+        self.calls += 1
+
+    def close(self):
+        self._file.close()
+
+
+class SQLiteSink(BaseSink):
+    """Stores rows in a SQLite table, newest first. Only inserts at the top of the
+    sheet (row 1) are supported, which is all the scanning station sends."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sheet_rows ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "inserted_at TEXT NOT NULL, "
+                "cells TEXT NOT NULL)"
+            )
+        self._lock = Lock()
+
+    def insert_rows(self, values, row=1, **kwargs):
+        if row != 1:
+            raise ValueError("SQLiteSink can only insert rows at the top of the sheet.")
+        timestamp = dt.datetime.now().isoformat(timespec="milliseconds")
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO sheet_rows (inserted_at, cells) VALUES (?, ?)",
+                [
+                    (timestamp, "\t".join(str(cell) for cell in values_row))
+                    for values_row in reversed(values)
+                ],
+            )
+        self.calls += 1
+        self.rows_written += len(values)
+
+    def delete_row(self, index):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM sheet_rows WHERE seq = "
+                "(SELECT seq FROM sheet_rows ORDER BY seq DESC LIMIT 1 OFFSET ?)",
+                (index - 1,),
+            )
+        self.calls += 1
+
+    def rows(self) -> List[List[str]]:
+        """Returns every stored row, top of the sheet first."""
+        with self._lock:
+            return [
+                cells.split("\t")
+                for (cells,) in self._conn.execute(
+                    "SELECT cells FROM sheet_rows ORDER BY seq DESC"
+                )
+            ]
+
+    def close(self):
+        self._conn.close()
+
+
+def openSink(kind: Optional[str]) -> Optional[BaseSink]:
+    """Builds the local sink selected by `kind`: "csv" or "sqlite" to keep rows in
+    `SINK_CSV_FILE` or `SINK_SQLITE_FILE`, or "null" to discard them. None means
+    no local sink, so rows go to Google Sheets."""
+    if kind is None:
+        return None
+    if kind == "csv":
+        return CSVSink(SINK_CSV_FILE)
+    if kind == "sqlite":
+        return SQLiteSink(SINK_SQLITE_FILE)
+    if kind == "null":
+        return NullSink()
+    raise ValueError(f'Unknown sink "{kind}", use "csv", "sqlite" or "null".')
@@ -1,13 +1,95 @@
 import socket
+from threading import Event, Lock, Thread
+import time
 
+from PyQt5.QtCore import QObject, pyqtSignal
 
-def isConnected():
-    """Detects an internet connection."""
+from ScannerApp.logger import logger
+
+
+CONNECTIVITY_TARGET = ("1.1.1.1", 80)
+CONNECTIVITY_TIMEOUT_SECS = 3.0
+
+
+def isConnected(address=CONNECTIVITY_TARGET, timeout=CONNECTIVITY_TIMEOUT_SECS):
+    """Detects an internet connection by opening a TCP connection to `address`."""
     try:
-        conn = socket.create_connection(("1.1.1.1", 80))
-        if conn is not None:
-            conn.close
-        return True
+        with socket.create_connection(address, timeout=timeout):
+            return True
     except OSError:
-        pass
-    return False
+        return False
+
+
+class ConnectivityMonitor(QObject):
+    """Probes `address` on a background thread every `interval_secs` and caches the result.
+    `isConnected` answers from the cache and only probes itself once the cached
+    state is older than `ttl_secs`. Emits `connectionChanged` when the state flips."""
+
+    connectionChanged = pyqtSignal(bool)
+
+    def __init__(
+        self,
+        address=CONNECTIVITY_TARGET,
+        timeout_secs: float = CONNECTIVITY_TIMEOUT_SECS,
+        interval_secs: float = 10.0,
+        ttl_secs: float = 30.0,
+    ):
+        super().__init__()
+        self.address = address
+        self.timeout_secs = timeout_secs
+        self.interval_secs = interval_secs
+        self.ttl_secs = ttl_secs
+
+        self._connected = None
+        self._checkedAt = 0.0
+        self._lock = Lock()
+        self._stopEvent = Event()
+        self._thread = None
+
+    def start(self):
+        """Starts background probing."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopEvent.clear()
+        self._thread = Thread(target=self._probeLoop, name="ConnectivityMonitor")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops background probing. Waits at most one probe timeout."""
+        self._stopEvent.set()
+        if self._thread is not None:
+            self._thread.join(self.timeout_secs)
+            self._thread = None
+
+    def _probeLoop(self):
+        while not self._stopEvent.is_set():
+            self.probe()
+            self._stopEvent.wait(self.interval_secs)
+
+    def probe(self) -> bool:
+        """Checks the connection now and updates the cached state."""
+        connected = isConnected(self.address, self.timeout_secs)
+        with self._lock:
+            changed = connected != self._connected
+            self._connected = connected
+            self._checkedAt = time.monotonic()
+        if changed:
+            logger.info("Internet connection %s.", "available" if connected else "lost")
+            self.connectionChanged.emit(connected)
+        return connected
+
+    def isConnected(self) -> bool:
+        """Returns the cached connection state, probing only if it has gone stale."""
+        with self._lock:
+            if (
+                self._connected is not None
+                and time.monotonic() - self._checkedAt < self.ttl_secs
+            ):
+                return self._connected
+        return self.probe()
+
+    def invalidate(self):
+        """Marks the cached state stale, e.g. after a call failed with a connection error."""
+        with self._lock:
+            self._checkedAt = 0.0
@@ -2,7 +2,21 @@ from ScannerApp.logger import logger
 
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QIcon
-from PyQt5.QtWidgets import QWidget, QLineEdit, QLabel, QGridLayout
+from PyQt5.QtWidgets import (
+    QAbstractItemView,
+    QGridLayout,
+    QHeaderView,
+    QLabel,
+    QLineEdit,
+    QTableView,
+    QWidget,
+)
+
+
+# usage counts of the last scan sit below the input and display rows,
+# with previous scans filling the rest of the grid
+USAGE_ROW = 2
+FIRST_HISTORY_ROW = 3
 
 
 class BarcodeDisplay(QWidget):
@@ -48,47 +62,50 @@ class BarcodeDisplay(QWidget):
         self.grid.addWidget(self.display, 1, 1)
         self.grid.addWidget(self.alert, 0, 2, 2, 1)
 
-    def updateList(self, entries_list):
-        # updates the list UI
-        # first make a list of (x,y) positions in the widget grid
-        # skip top two rows which hold widgets we don't want rotated
-        positions = [(i, j) for i in range(2, 12) for j in range(3)]
-
-        # flatten the entries list
-        entries = []
-        for item in entries_list:
-            try:
-                entries.extend(item.getBarcodeView())
-            except AttributeError:
-                entries.extend(["", "", ""])
-
-        for position, entry in zip(positions, entries):
-            label = QLabel(entry)
-            label.setProperty("class", "entry")
-            # put the new widget at the (x,y) position
-            self.grid.addWidget(label, *position)
-
-    def clearLayout(self):  # thank mr. riverbank
-        WIDGET_TOTAL = 30  # num of widgets that need deleting
-        TOP_ROW = 5  # num of widgets in front to keep
-        i = 0
-        while i < WIDGET_TOTAL:
-            i += 1
-            item = self.grid.takeAt(TOP_ROW)
-            if not item:
-                continue
-            w = item.widget()
-            if w:
-                w.deleteLater()
-
-    def barcodeSubmitted(self, entries_list):
-        """Handles changing of the view when a barcode is submitted."""
+        self.usage = QLabel("")
+        self.usage.setProperty("class", "display")
+        self.grid.addWidget(self.usage, USAGE_ROW, 0, 1, 3)
+
+        self.initHistoryTable()
+
+    def initHistoryTable(self):
+        """Creates the scrollable table of previous scans. Only visible rows are
+        painted, so a scan costs the same however long the history is."""
+        self.table = QTableView(self)
+        self.table.setProperty("class", "history")
+        # keep keyboard focus in the scan field so the scanner always types there
+        self.table.setFocusPolicy(Qt.NoFocus)
+        self.table.setSelectionMode(QAbstractItemView.NoSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setShowGrid(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # fixed row heights avoid measuring every row when rows are inserted
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().hide()
+        self.grid.addWidget(self.table, FIRST_HISTORY_ROW, 0, 1, 3)
+        self.grid.setRowStretch(FIRST_HISTORY_ROW, 1)
+
+    def setHistoryModel(self, model):
+        """Shows `model`, a QAbstractItemModel of scans, in the history table."""
+        self.table.setModel(model)
+
+    def barcodeSubmitted(self):
+        """Handles changing of the view when a barcode is submitted.
+        The history table updates itself from its model's signals."""
         text = self.le.text()
         self.le.clear()
         self.display.setText('"' + text + '"')
-
-        self.clearLayout()
-        self.updateList(entries_list)
+        self.table.scrollToTop()
+
+    def showUsage(self, standard_id, counts=None):
+        """Shows how often `standard_id` was scanned, or clears it if None."""
+        if standard_id is None:
+            self.usage.setText("")
+            return
+        self.usage.setText(
+            f"{standard_id} scanned {counts['last_hour']} times in the last hour, "
+            f"{counts['shift']} this shift, {counts['today']} today"
+        )
 
     def connectUserInputSlot(self, slot_func):
         self.le.returnPressed.connect(slot_func)
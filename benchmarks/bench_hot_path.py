@@ -0,0 +1,232 @@
+"""Micro-benchmarks for the per-scan hot path.
+
+Results are written as JSON so runs from different releases can be compared.
+
+    python -m benchmarks.bench_hot_path --output bench_hot_path.json
+    python -m benchmarks.bench_hot_path --only scan_counter --history-sizes 10000,100000
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+# the display benchmark needs no screen
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication
+
+import scan_counter
+from ScannerApp.api import GSpreadWorker
+from ScannerApp.barcode import BarcodeRegistry, OrganicPrepStandardBarcodeScan
+from ScannerApp.model import ScannerModel
+from ScannerApp.queues import ItemQueue
+from ScannerApp.sinks import NullSink
+from ScannerApp.view import BarcodeDisplay
+
+
+VALID_BARCODE = "pp1234ab-123456,"
+INVALID_BARCODE = "not a prepped standard barcode"
+DEFAULT_HISTORY_SIZES = "10000,100000,1000000,10000000"
+
+
+def measure(name, func, number, repeat=5, **params) -> dict:
+    """Times `number` calls of `func`, `repeat` times, and keeps the best and mean runs."""
+    runs = timeit.repeat(func, number=number, repeat=repeat, timer=time.perf_counter)
+    return {
+        "name": name,
+        "params": params,
+        "number": number,
+        "repeat": repeat,
+        "best_secs": min(runs),
+        "mean_secs": sum(runs) / len(runs),
+        "per_op_usecs": min(runs) / number * 1e6,
+    }
+
+
+def bench_barcode(number):
+    registry = BarcodeRegistry()
+    return [
+        measure(
+            "barcode_parse",
+            lambda: OrganicPrepStandardBarcodeScan(VALID_BARCODE),
+            number,
+            valid=True,
+        ),
+        measure(
+            "barcode_parse",
+            lambda: OrganicPrepStandardBarcodeScan(INVALID_BARCODE),
+            number,
+            valid=False,
+        ),
+        measure(
+            "barcode_registry_parse",
+            lambda: registry(VALID_BARCODE),
+            number,
+            valid=True,
+            formats=len(registry.classes),
+        ),
+    ]
+
+
+def bench_model(number):
+    model = ScannerModel(OrganicPrepStandardBarcodeScan)
+    result = measure(
+        "model_process_new_entry",
+        lambda: model.processNewEntry(VALID_BARCODE),
+        number,
+    )
+    model.close()
+    return [result]
+
+
+def bench_display(number, history_sizes=(20, 5000)):
+    """Times a scan from model insert to repaint, with the table view attached,
+    for a short and a full-shift history."""
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = []
+    for history in history_sizes:
+        model = ScannerModel(OrganicPrepStandardBarcodeScan, history_length=history)
+        for _ in range(history):
+            model.processNewEntry(VALID_BARCODE)
+        display = BarcodeDisplay()
+        display.setHistoryModel(model)
+        display.show()
+
+        def submit():
+            model.processNewEntry(VALID_BARCODE)
+            display.barcodeSubmitted()
+            app.processEvents()  # include layout and paint work
+
+        results.append(
+            measure("display_barcode_submitted", submit, number, history=history)
+        )
+        display.close()
+        model.close()
+    return results
+
+
+def bench_parse_deque_item(number):
+    worker = GSpreadWorker(ItemQueue(), "benchmark", "Scan", sink=NullSink())
+    item = OrganicPrepStandardBarcodeScan(VALID_BARCODE).getAPIinfo()
+    return [measure("parse_deque_item", lambda: worker.parseDequeItem(item), number)]
+
+
+def write_history(path, lines):
+    """Writes a synthetic scan_history.log with `lines` scans, one per minute."""
+    start = dt.datetime(2021, 10, 26, 5, 0)
+    standards = [f"pp{n:04d}" for n in range(200)] + [f"{n:05d}" for n in range(200)]
+    rng = random.Random(0)
+    with open(path, "w") as history:
+        for i in range(lines):
+            timestamp = (start + dt.timedelta(minutes=i)).strftime("%m/%d/%y %H:%M")
+            if i % 50 == 49:
+                barcode = INVALID_BARCODE
+            else:
+                barcode = f"{rng.choice(standards)}ab-123456,"
+            history.write(f"{timestamp}, {barcode}\n")
+    return start, start + dt.timedelta(minutes=lines)
+
+
+def bench_scan_counter(history_sizes):
+    results = []
+    for lines in history_sizes:
+        path = os.path.abspath(f"history_{lines}.log")
+        start, end = write_history(path, lines)
+        scan_counter.HISTORY_FILE = path
+        scan_counter.OUTPUT_FILE = os.path.abspath("scan_counter.log")
+        # the first call also builds the log's time index
+        for span, query_start in (
+            ("all", start),
+            ("last_day", end - dt.timedelta(days=1)),
+        ):
+            result = measure(
+                "scan_counter_get_scan_count",
+                lambda: scan_counter.get_scan_count(query_start, end),
+                number=1,
+                repeat=3 if lines <= 1_000_000 else 1,
+                lines=lines,
+                span=span,
+            )
+            result["lines_per_sec"] = lines / result["best_secs"]
+            results.append(result)
+        os.remove(path)
+        os.remove(path + ".idx")
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=1000, help="calls per run")
+    parser.add_argument(
+        "--history-sizes",
+        default=DEFAULT_HISTORY_SIZES,
+        help="comma separated scan_counter history line counts",
+    )
+    parser.add_argument(
+        "--only",
+        choices=["barcode", "model", "display", "parse", "scan_counter"],
+        action="append",
+        help="run only these benchmarks (repeatable)",
+    )
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+    output = os.path.abspath(args.output) if args.output else None
+
+    benches = {
+        "barcode": lambda: bench_barcode(args.number),
+        "model": lambda: bench_model(args.number),
+        "display": lambda: bench_display(max(args.number // 10, 1)),
+        "parse": lambda: bench_parse_deque_item(args.number),
+        "scan_counter": lambda: bench_scan_counter(
+            [int(size) for size in args.history_sizes.split(",")]
+        ),
+    }
+
+    results = []
+    # scan logs, history files and errors are written to a scratch directory
+    os.chdir(tempfile.mkdtemp(prefix="bench_hot_path_"))
+    for name, bench in benches.items():
+        if args.only is None or name in args.only:
+            results.extend(bench())
+
+    report = {
+        "suite": "hot_path",
+        "git_revision": git_revision(),
+        "timestamp": dt.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        # scan_counter uses its NumPy engine when numpy is installed
+        "numpy": scan_counter.np.__version__ if scan_counter.np else None,
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
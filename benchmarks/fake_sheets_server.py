@@ -0,0 +1,352 @@
+"""Local stand-in for the Google Sheets v4 API, for load and latency testing.
+
+Implements just enough of the API for gspread's open_by_key, worksheet,
+insert_rows, delete_row and get_values, and the batchUpdate that
+GSpreadSink.insert_rows sends, with configurable latency, injected
+429 / 5xx errors and per-minute read and write quotas. Use FakeSheetsSession
+in place of ScannerApp.api.SpreadsheetSession to point the app at it."""
+
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+from threading import Lock, Thread
+import time
+from urllib.parse import unquote, urlsplit
+
+import gspread
+import requests
+from requests.adapters import HTTPAdapter
+
+from ScannerApp.api import SpreadsheetSession
+
+
+SHEETS_API_URL = "https://sheets.googleapis.com"
+SPREADSHEET_PATH = re.compile(r"^/v4/spreadsheets/([^/:]+)(.*)$")
+CELL_ROW = re.compile(r"^[A-Za-z]*(\d+)$")
+
+
+class FakeSheetsServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding spreadsheets in memory.
+
+    `latency_secs` is added to every response, plus up to `jitter_secs` more.
+    `error_429_rate` and `error_5xx_rate` are the chances a request fails.
+    Requests beyond `read_quota_per_min` GETs or `write_quota_per_min` POSTs
+    in the last 60 seconds are answered with 429, like the real API.
+    `commit_times` records when each written cell value was first stored."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        latency_secs=0.0,
+        jitter_secs=0.0,
+        error_429_rate=0.0,
+        error_5xx_rate=0.0,
+        read_quota_per_min=None,
+        write_quota_per_min=None,
+    ):
+        super().__init__((host, port), _FakeSheetsRequestHandler)
+        self.latency_secs = latency_secs
+        self.jitter_secs = jitter_secs
+        self.error_429_rate = error_429_rate
+        self.error_5xx_rate = error_5xx_rate
+        self.quotas = {"read": read_quota_per_min, "write": write_quota_per_min}
+
+        self.spreadsheets = {}
+        self.commit_times = {}
+        self.request_counts = {"read": 0, "write": 0, "429": 0, "5xx": 0}
+        self._recentRequests = {"read": deque(), "write": deque()}
+        self._lock = Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def addSpreadsheet(self, key, sheet_names=("Scan",)):
+        """Creates an empty spreadsheet with the given worksheets."""
+        with self._lock:
+            self.spreadsheets[key] = {
+                "title": key,
+                "sheets": {
+                    name: {"sheetId": index, "index": index, "rows": []}
+                    for index, name in enumerate(sheet_names)
+                },
+            }
+
+    def rows(self, key, sheet_name) -> list:
+        with self._lock:
+            return [
+                list(row)
+                for row in self.spreadsheets[key]["sheets"][sheet_name]["rows"]
+            ]
+
+    def start(self):
+        self._thread = Thread(target=self.serve_forever, name="FakeSheetsServer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def admit(self, kind: str):
+        """Returns an HTTP error status for this request, or None to serve it."""
+        with self._lock:
+            self.request_counts[kind] += 1
+            quota = self.quotas[kind]
+            if quota is not None:
+                recent = self._recentRequests[kind]
+                now = time.monotonic()
+                while recent and now - recent[0] >= 60:
+                    recent.popleft()
+                if len(recent) >= quota:
+                    self.request_counts["429"] += 1
+                    return 429
+                recent.append(now)
+            roll = random.random()
+            if roll < self.error_429_rate:
+                self.request_counts["429"] += 1
+                return 429
+            if roll < self.error_429_rate + self.error_5xx_rate:
+                self.request_counts["5xx"] += 1
+                return 503
+        return None
+
+
+def _parseRange(range_name: str):
+    """Splits "'Sheet'!A5" or "'Sheet'!1:50" into (title, first row, last row)."""
+    title, _, cells = range_name.partition("!")
+    if title.startswith("'") and title.endswith("'"):
+        title = title[1:-1].replace("''", "'")
+    first_row, last_row = 1, None
+    if cells:
+        start, _, end = cells.partition(":")
+        start_match = CELL_ROW.match(start)
+        end_match = CELL_ROW.match(end)
+        if start_match:
+            first_row = int(start_match.group(1))
+        if end_match:
+            last_row = int(end_match.group(1))
+    return title, first_row, last_row
+
+
+class _FakeSheetsRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def do_GET(self):
+        self._handle("read")
+
+    def do_POST(self):
+        self._handle("write")
+
+    def _handle(self, kind):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length)) if length else {}
+
+        delay = server.latency_secs + random.uniform(0, server.jitter_secs)
+        if delay:
+            time.sleep(delay)
+
+        status = server.admit(kind)
+        if status is not None:
+            self._error(status)
+            return
+
+        match = SPREADSHEET_PATH.match(urlsplit(self.path).path)
+        if not match or match.group(1) not in server.spreadsheets:
+            self._error(404)
+            return
+        key, rest = match.group(1), unquote(match.group(2))
+        with server._lock:
+            spreadsheet = server.spreadsheets[key]
+            if kind == "read" and rest == "":
+                self._reply(200, self._metadata(key, spreadsheet))
+            elif kind == "read" and rest.startswith("/values/"):
+                self._getValues(spreadsheet, rest[len("/values/") :])
+            elif kind == "write" and rest == ":batchUpdate":
+                self._batchUpdate(key, spreadsheet, body)
+            elif (
+                kind == "write"
+                and rest.startswith("/values/")
+                and rest.endswith(":append")
+            ):
+                self._appendValues(
+                    key, spreadsheet, rest[len("/values/") : -len(":append")], body
+                )
+            else:
+                self._error(404)
+
+    def _metadata(self, key, spreadsheet):
+        return {
+            "spreadsheetId": key,
+            "properties": {"title": spreadsheet["title"]},
+            "sheets": [
+                {
+                    "properties": {
+                        "sheetId": sheet["sheetId"],
+                        "title": title,
+                        "index": sheet["index"],
+                        "sheetType": "GRID",
+                        "gridProperties": {
+                            "rowCount": max(len(sheet["rows"]), 1000),
+                            "columnCount": 26,
+                        },
+                    }
+                }
+                for title, sheet in spreadsheet["sheets"].items()
+            ],
+        }
+
+    def _sheetById(self, spreadsheet, sheet_id):
+        for sheet in spreadsheet["sheets"].values():
+            if sheet["sheetId"] == sheet_id:
+                return sheet
+        return None
+
+    def _getValues(self, spreadsheet, range_name):
+        title, first_row, last_row = _parseRange(range_name)
+        if title not in spreadsheet["sheets"]:
+            self._error(400)
+            return
+        rows = spreadsheet["sheets"][title]["rows"]
+        values = rows[first_row - 1 : last_row]
+        while values and not values[-1]:
+            values = values[:-1]
+        self._reply(
+            200, {"range": range_name, "majorDimension": "ROWS", "values": values}
+        )
+
+    def _batchUpdate(self, key, spreadsheet, body):
+        """Applies every request in the batch, or none of them, like the real API."""
+        changed = {}  # sheetId -> rows after the requests so far
+        cells = []
+        for request in body.get("requests", []):
+            op, params = next(iter(request.items()), (None, None))
+            if op in ("insertDimension", "deleteDimension"):
+                dim_range = params["range"]
+                sheet_id = dim_range["sheetId"]
+                if dim_range.get("dimension") != "ROWS":
+                    self._error(400)
+                    return
+            elif op in ("updateCells", "appendDimension"):
+                sheet_id = params.get("start", params)["sheetId"]
+            else:
+                self._error(400)
+                return
+            sheet = self._sheetById(spreadsheet, sheet_id)
+            if sheet is None:
+                self._error(400)
+                return
+            rows = changed.setdefault(sheet_id, [list(row) for row in sheet["rows"]])
+
+            if op == "insertDimension":
+                start = dim_range["startIndex"]
+                end = dim_range.get("endIndex") or start + 1
+                rows[start:start] = [[] for _ in range(end - start)]
+            elif op == "deleteDimension":
+                start = dim_range["startIndex"]
+                end = dim_range.get("endIndex") or start + 1
+                del rows[start:end]
+            elif op == "updateCells":
+                start_row = params["start"].get("rowIndex", 0)
+                start_col = params["start"].get("columnIndex", 0)
+                for offset, row_data in enumerate(params.get("rows", [])):
+                    index = start_row + offset
+                    while len(rows) <= index:
+                        rows.append([])
+                    row = rows[index]
+                    for col, cell in enumerate(row_data.get("values", []), start_col):
+                        value = next(
+                            iter(cell.get("userEnteredValue", {}).values()), ""
+                        )
+                        while len(row) <= col:
+                            row.append("")
+                        row[col] = str(value)
+                        cells.append(row[col])
+
+        for sheet_id, rows in changed.items():
+            self._sheetById(spreadsheet, sheet_id)["rows"] = rows
+        now = time.monotonic()
+        for cell in cells:
+            self.server.commit_times.setdefault(cell, now)
+        self._reply(200, {"spreadsheetId": key, "replies": [{}]})
+
+    def _appendValues(self, key, spreadsheet, range_name, body):
+        title, first_row, _ = _parseRange(range_name)
+        if title not in spreadsheet["sheets"]:
+            self._error(400)
+            return
+        rows = spreadsheet["sheets"][title]["rows"]
+        values = body.get("values", [])
+        now = time.monotonic()
+        for offset, values_row in enumerate(values):
+            index = first_row - 1 + offset
+            while len(rows) <= index:
+                rows.append([])
+            rows[index] = [str(cell) for cell in values_row]
+            for cell in rows[index]:
+                self.server.commit_times.setdefault(cell, now)
+        self._reply(
+            200,
+            {"spreadsheetId": key, "updates": {"updatedRows": len(values)}},
+        )
+
+    def _error(self, status):
+        names = {
+            400: "INVALID_ARGUMENT",
+            404: "NOT_FOUND",
+            429: "RESOURCE_EXHAUSTED",
+            503: "UNAVAILABLE",
+        }
+        self._reply(
+            status,
+            {
+                "error": {
+                    "code": status,
+                    "message": f"Fake Sheets API error {status}",
+                    "status": names.get(status, "UNKNOWN"),
+                }
+            },
+        )
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _RedirectAdapter(HTTPAdapter):
+    """Sends requests meant for the Sheets API to the fake server instead."""
+
+    def __init__(self, target_url, **kwargs):
+        super().__init__(**kwargs)
+        self.target_url = target_url
+
+    def send(self, request, **kwargs):
+        request.url = self.target_url + request.url[len(SHEETS_API_URL) :]
+        return super().send(request, **kwargs)
+
+
+class FakeSheetsSession(SpreadsheetSession):
+    """SpreadsheetSession that talks to a FakeSheetsServer without credentials."""
+
+    def __init__(self, spreadsheet_key, server_url):
+        super().__init__(spreadsheet_key)
+        self.server_url = server_url
+
+    def _authorize(self):
+        http_session = requests.Session()
+        http_session.mount(SHEETS_API_URL, _RedirectAdapter(self.server_url))
+        self.client = gspread.Client(None, session=http_session)
@@ -0,0 +1,171 @@
+"""Load test for the upload pipeline in ScannerApp/api.py against FakeSheetsServer.
+
+Feeds scans into a real GSpreadAPIHandler at a fixed rate and reports sustained
+scans/sec and p50/p99 time from scan to committed row, as JSON on stdout.
+With --sink memory rows go to a MemorySheetSink instead, measuring the pipeline
+with no network at all.
+
+    python -m benchmarks.upload_harness --scans 300 --rate 10 --latency 0.2 --error-429 0.02
+    python -m benchmarks.upload_harness --scans 1000 --rate 100 --sink memory
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from PyQt5.QtCore import QCoreApplication, QTimer
+
+from ScannerApp.api import GSpreadAPIHandler, SheetsRateLimiter
+from ScannerApp.queues import ItemQueue
+from ScannerApp.sinks import MemorySheetSink
+from ScannerApp.utils import ConnectivityMonitor
+from benchmarks.fake_sheets_server import FakeSheetsServer, FakeSheetsSession
+
+
+SPREADSHEET_KEY = "benchmark"
+SHEET_NAME = "Scan"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def run(args) -> dict:
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+
+    # the handler reads and writes deque_dump.json in the working directory
+    os.chdir(tempfile.mkdtemp(prefix="upload_harness_"))
+    if args.sink == "memory":
+        server = None
+        sink = MemorySheetSink()
+        handler = GSpreadAPIHandler(
+            SPREADSHEET_KEY, SHEET_NAME, queue=ItemQueue(), sink=sink
+        )
+        commit_times = sink.commit_times
+    else:
+        server = FakeSheetsServer(
+            latency_secs=args.latency,
+            jitter_secs=args.jitter,
+            error_429_rate=args.error_429,
+            error_5xx_rate=args.error_5xx,
+            read_quota_per_min=args.read_quota,
+            write_quota_per_min=args.write_quota,
+        )
+        server.addSpreadsheet(SPREADSHEET_KEY, [SHEET_NAME])
+        server.start()
+        handler = GSpreadAPIHandler(
+            SPREADSHEET_KEY,
+            SHEET_NAME,
+            rate_limiter=SheetsRateLimiter(
+                read_per_min=args.client_read_quota,
+                write_per_min=args.client_write_quota,
+            ),
+            queue=ItemQueue(),
+            connectivity=ConnectivityMonitor(address=server.server_address),
+            session=FakeSheetsSession(SPREADSHEET_KEY, server.url),
+        )
+        commit_times = server.commit_times
+
+    scan_times = {}
+    deadline = [None]
+
+    def scan():
+        if len(scan_times) >= args.scans:
+            return
+        barcode = f"bench{len(scan_times):07d}"
+        scan_times[barcode] = time.monotonic()
+        handler.addItem({"function": "insert_rows", "values": [[barcode]]})
+        if len(scan_times) == args.scans:
+            scan_timer.stop()
+            deadline[0] = time.monotonic() + args.drain_timeout
+
+    def check_done():
+        committed = sum(1 for barcode in scan_times if barcode in commit_times)
+        finished = deadline[0] is not None and (
+            committed == args.scans or time.monotonic() > deadline[0]
+        )
+        if finished:
+            check_timer.stop()
+            app.quit()
+
+    scan_timer = QTimer()
+    scan_timer.timeout.connect(scan)
+    scan_timer.start(max(int(1000 / args.rate), 1))
+    check_timer = QTimer()
+    check_timer.timeout.connect(check_done)
+    check_timer.start(50)
+
+    start = time.monotonic()
+    app.exec()
+    handler.shutdown()
+    if server is None:
+        rows = sink.rows
+        requests = {"sink_calls": sink.calls}
+    else:
+        server.stop()
+        rows = server.rows(SPREADSHEET_KEY, SHEET_NAME)
+        requests = server.request_counts
+
+    latencies = [
+        commit_times[barcode] - scanned
+        for barcode, scanned in scan_times.items()
+        if barcode in commit_times
+    ]
+    last_commit = max(
+        (commit_times[b] for b in scan_times if b in commit_times),
+        default=start,
+    )
+    elapsed = max(last_commit - start, 1e-9)
+    return {
+        "config": vars(args),
+        "scans": len(scan_times),
+        "committed": len(latencies),
+        "elapsed_secs": round(elapsed, 3),
+        "scans_per_sec": round(len(latencies) / elapsed, 3),
+        "latency_p50_secs": percentile(latencies, 50),
+        "latency_p99_secs": percentile(latencies, 99),
+        "latency_mean_secs": statistics.mean(latencies) if latencies else None,
+        "server_requests": requests,
+        # inserts are a single batchUpdate, so a retry can no longer leave blank rows
+        "blank_rows": sum(1 for row in rows if not row),
+        "rows_in_order": [row for row in rows if row]
+        == [[b] for b in sorted(scan_times, reverse=True)],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scans", type=int, default=200, help="number of scans")
+    parser.add_argument(
+        "--sink",
+        choices=["fake-sheets", "memory"],
+        default="fake-sheets",
+        help="where rows are committed; memory skips the network entirely",
+    )
+    parser.add_argument("--rate", type=float, default=10, help="scans per second")
+    parser.add_argument("--latency", type=float, default=0.1, help="server seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="extra seconds")
+    parser.add_argument("--error-429", type=float, default=0.0, help="429 chance")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="503 chance")
+    parser.add_argument("--read-quota", type=int, default=60, help="server reads/min")
+    parser.add_argument("--write-quota", type=int, default=60, help="server writes/min")
+    parser.add_argument("--client-read-quota", type=int, default=60)
+    parser.add_argument("--client-write-quota", type=int, default=60)
+    parser.add_argument(
+        "--drain-timeout", type=float, default=120, help="seconds to wait for uploads"
+    )
+    result = run(parser.parse_args(argv))
+    json.dump(result, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Runs the scan collector that merges items from several scanning stations
+into one batched, rate-limited Google Sheets write stream.
+Point stations at it by setting COLLECTOR_URL in run.py. Without a
+COLLECTOR_TOKEN in run.py it only accepts stations on this computer."""
+
+import functools
+import signal
+import sys
+
+from PyQt5.QtCore import QCoreApplication, QTimer
+
+from ScannerApp.api import GSpreadAPIHandler
+from ScannerApp.collector import COLLECTOR_HOST, COLLECTOR_PORT, ScanCollector
+from ScannerApp.logger import logger
+from ScannerApp.queues import openOutbox
+from ScannerApp.sinks import openSink
+from run import COLLECTOR_TOKEN, OUTBOX, SINK, SPREADSHEET_KEY, SHEET_NAME_TO_SCAN
+
+
+def main():
+    app = QCoreApplication(sys.argv)
+    if COLLECTOR_TOKEN:
+        host = "0.0.0.0"
+    else:
+        host = COLLECTOR_HOST
+        logger.warning("No COLLECTOR_TOKEN set, only accepting local stations.")
+    api = functools.partial(
+        GSpreadAPIHandler, queue=openOutbox(OUTBOX), sink=openSink(SINK)
+    )
+    collector = ScanCollector(
+        SPREADSHEET_KEY,
+        SHEET_NAME_TO_SCAN,
+        host=host,
+        port=COLLECTOR_PORT,
+        token=COLLECTOR_TOKEN,
+        api=api,
+    )
+    app.aboutToQuit.connect(collector.shutdown)
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+
+    # let the Python interpreter run so Ctrl+C is handled
+    timer = QTimer()
+    timer.timeout.connect(lambda: None)
+    timer.start(500)
+
+    collector.start()
+    sys.exit(app.exec())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,59 @@
+import functools
+import os
 import sys
 
 from PyQt5.QtWidgets import QApplication
 
+from ScannerApp.barcode import BarcodeRegistry
+from ScannerApp.api import GSpreadAPIHandler
+from ScannerApp.collector import (
+    STATION_JOURNAL_FILE,
+    STATION_OUTBOX_FILE,
+    CollectorAPIHandler,
+)
 from ScannerApp.controller import BarcodeScannerApp
+from ScannerApp.queues import openOutbox
+from ScannerApp.sinks import openSink
 
 
 SPREADSHEET_KEY = "11Y3oufYpwWanKRB0KzxsrhkqErfPgak-LylKCt6a4i0"  # test spreadsheet
 # SPREADSHEET_KEY = "1c0J8E4Z96jPnu2hqgwEEXzWmhldv-BHCU66rwUCrWw0" # Prep Inventory
 SHEET_NAME_TO_SCAN = "Scan"
+# send scans through a collector.py service instead of directly to Google
+COLLECTOR_URL = None  # e.g. "http://prep-lab-pc:8765"
+# shared secret between the stations and the collector; the collector only
+# accepts stations from other computers when it is set
+COLLECTOR_TOKEN = None
+# where unsent scans wait: "journal" keeps them in memory and an append-only file,
+# "sqlite" keeps them only on disk, for stations that may be offline for days
+OUTBOX = "journal"
+# None sends rows to Google Sheets; "csv" or "sqlite" keeps them in a local file
+# instead, e.g. during a long outage, and "null" discards them for benchmarking
+SINK = None
+# barcode formats are read from here when it exists, see config.example.ini
+CONFIG_FILE = "config.ini"
 
 
 def main():
     app = QApplication(sys.argv)
-    bsa = BarcodeScannerApp(SPREADSHEET_KEY, SHEET_NAME_TO_SCAN)
+    if os.path.exists(CONFIG_FILE):
+        barcode_cls = BarcodeRegistry.fromConfig(CONFIG_FILE)
+    else:
+        barcode_cls = BarcodeRegistry()
+    if COLLECTOR_URL:
+        api = functools.partial(
+            CollectorAPIHandler,
+            collector_url=COLLECTOR_URL,
+            token=COLLECTOR_TOKEN,
+            queue=openOutbox(OUTBOX, STATION_JOURNAL_FILE, STATION_OUTBOX_FILE),
+        )
+    else:
+        api = functools.partial(
+            GSpreadAPIHandler, queue=openOutbox(OUTBOX), sink=openSink(SINK)
+        )
+    bsa = BarcodeScannerApp(
+        SPREADSHEET_KEY, SHEET_NAME_TO_SCAN, barcode_cls=barcode_cls, api=api
+    )
     bsa.showMaximized()
     sys.exit(app.exec())
 
@@ -1,41 +1,668 @@
 """Script to count the number of scans in the scan log 
 for each standard between two datetimes"""
 
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import glob
+import hashlib
+import json
+import os
 import re
+import shutil
 import datetime as dt
 
+try:
+    import numpy as np
+except ImportError:  # optional, counts fall back to a line by line loop
+    np = None
+
+from ScannerApp.history import (
+    HISTORY_STORE,
+    NO_VALUE,
+    ScanHistoryReader,
+    ScanHistoryStore,
+    packExpiry,
+    toEpochMs,
+)
+from ScannerApp.scan_log import ScanLogIndex, datetimeHourKey
+
 BARCODE_REGEX = re.compile(
     r"(pp[0-9]{4,5}|eph[0-9]{4}|[0-9]{4,5})[A-Za-z]{0,2}-([0-9]{5,6})",
     flags=re.IGNORECASE,
 )
 HISTORY_FILE = "scan_history.log"
 OUTPUT_FILE = "scan_counter.log"
+HOURLY_OUTPUT_FILE = "scan_counter_hourly.log"
+DAILY_OUTPUT_FILE = "scan_counter_daily.log"
+LOG_DATE_FORMAT = "%m/%d/%y %H:%M"
+CONVERT_CHUNK_LINES = 10000
+CHUNK_BYTES = 8 * 1024 * 1024
+# byte ranges larger than this are split across worker processes
+TASK_BYTES = 64 * 1024 * 1024
+CHECKPOINT_FILE = "scan_counter_checkpoint.json"
+# bytes at the start of a file that identify it in the checkpoint
+HEAD_BYTES = 256
+# files counted when a directory is given
+HISTORY_GLOB = "*scan_history*.log"
+# fixed-width layout of well-formed lines, parsed by aggregate_chunks
+TIMESTAMP_BYTES = len("MM/DD/YY HH:MM,")
+TAIL_BYTES = 32
+if np is not None:
+    TIMESTAMP_DIGITS = np.array([0, 1, 3, 4, 6, 7, 9, 10, 12, 13])
+    TIMESTAMP_SEPARATORS = ((2, "/"), (5, "/"), (8, " "), (11, ":"), (14, ","))
+    DAYS_IN_MONTH = np.array([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+    FIELD_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
 
 
-def get_scan_count(start_datetime, end_datetime):
+def get_scan_count(
+    start_datetime, end_datetime, histograms=False, paths=None, workers=None
+):
     """
     Get the number of scans between two dates.
+    `paths` are history files, globs or directories, HISTORY_FILE by default.
+    Only the hours of each log in the range are read, found with its time index,
+    and large ranges are split into byte ranges counted in a pool of `workers`
+    processes. Uses the vectorized NumPy engine when numpy is installed. Returns
+    the per-standard counts and the hourly and daily histograms of counted scans.
+    """
+    files = expand_paths(paths or [HISTORY_FILE])
+    plan = functools.partial(
+        plan_file, start_datetime=start_datetime, end_datetime=end_datetime
+    )
+    count = functools.partial(
+        count_range, start_datetime=start_datetime, end_datetime=end_datetime
+    )
+
+    tasks = [task for tasks in map_tasks(plan, files, workers) for task in tasks]
+    results = map_tasks(count, tasks, workers)
+    scan_count, hourly, daily = merge_counts(results)
+
+    write_scan_count(scan_count)
+    if histograms:
+        write_histograms(hourly, daily)
+    return scan_count, hourly, daily
+
+
+def map_tasks(func, items, workers=None):
+    """
+    Map `func` over `items` in a pool of `workers` processes, or in this
+    process when there is only one item or one worker.
+    """
+    if workers == 1 or len(items) <= 1:
+        return list(map(func, items))
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(func, items))
+
+
+def merge_counts(results, scan_count=None, hourly=None, daily=None):
+    """
+    Add up (scan_count, hourly, daily) results in order, onto the given totals,
+    so standards keep the order they were first seen in.
+    """
+    scan_count = {} if scan_count is None else scan_count
+    hourly = [0] * 24 if hourly is None else hourly
+    daily = {} if daily is None else daily
+    for task_count, task_hourly, task_daily in results:
+        for barcode, n in task_count.items():
+            scan_count[barcode] = scan_count.get(barcode, 0) + n
+        hourly = [a + b for a, b in zip(hourly, task_hourly)]
+        for date, n in task_daily.items():
+            daily[date] = daily.get(date, 0) + n
+    return scan_count, hourly, dict(sorted(daily.items()))
+
+
+def expand_paths(paths):
+    """
+    Expand history files, globs and directories into a list of files.
+    Directories contribute the files matching HISTORY_GLOB.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            matches = sorted(glob.glob(os.path.join(path, HISTORY_GLOB)))
+        elif glob.has_magic(path):
+            matches = sorted(glob.glob(path))
+        else:
+            matches = [path]  # a missing file raises when it is read
+        files.extend(m for m in matches if m not in files)
+    if not files:
+        raise FileNotFoundError(f"No scan history files match {paths}")
+    return files
+
+
+def plan_file(path, start_datetime, end_datetime):
+    """
+    Split the part of a history file in a time range into (path, start, stop)
+    byte ranges of about TASK_BYTES, cut on line boundaries.
+    """
+    index = ScanLogIndex(path)
+    index.catchUp()
+    segments = index.segments(
+        datetimeHourKey(start_datetime), datetimeHourKey(end_datetime)
+    )
+    tasks = []
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        for start, stop in segments:
+            tasks.extend(split_range(f, path, start, size if stop is None else stop))
+    return tasks
+
+
+def split_range(f, path, start, stop):
+    """
+    Split bytes `start` to `stop` of the open file `f` at `path` into
+    (path, start, stop) ranges of about TASK_BYTES, cut on line boundaries.
+    """
+    tasks = []
+    while stop - start > TASK_BYTES:
+        f.seek(start + TASK_BYTES)
+        f.readline()
+        cut = f.tell()
+        if cut >= stop:
+            break
+        tasks.append((path, start, cut))
+        start = cut
+    tasks.append((path, start, stop))
+    return tasks
+
+
+def count_range(task, start_datetime, end_datetime):
+    """
+    Count the scans in one (path, start, stop) byte range of a history file.
+    """
+    path, start, stop = task
+    if np is None:
+        aggregate = aggregate_lines
+    else:
+        aggregate = aggregate_chunks
+    return aggregate(read_chunks(path, [(start, stop)]), start_datetime, end_datetime)
+
+
+def read_chunks(path, segments):
+    """
+    Yield the byte ranges `segments` of a file in large chunks of whole lines.
+    """
+    with open(path, "rb") as f:
+        for start, stop in segments:
+            f.seek(start)
+            remaining = None if stop is None else stop - start
+            carry = b""
+            while remaining is None or remaining > 0:
+                size = CHUNK_BYTES if remaining is None else min(CHUNK_BYTES, remaining)
+                block = f.read(size)
+                if not block:
+                    break
+                if remaining is not None:
+                    remaining -= len(block)
+                data = carry + block
+                cut = data.rfind(b"\n") + 1
+                if cut:
+                    yield data[:cut]
+                carry = data[cut:]
+            if carry:
+                yield carry + b"\n"
+
+
+def parse_line(line):
+    """
+    Parse a log line into its datetime and standard ID, or None if unmatched.
+    """
+    l = line.decode().split(",")
+    date = dt.datetime.strptime(l[0], LOG_DATE_FORMAT)
+    m = BARCODE_REGEX.search(l[1])
+    return date, m.group(1) if m else None
+
+
+def aggregate_lines(chunks, start_datetime, end_datetime):
+    """
+    Count scans per standard, hour of day and day, one line at a time.
     """
     scan_count = {}
-    with open(HISTORY_FILE, "r") as f:
-        for line in f:
-            l = line.split(",")
-            date = dt.datetime.strptime(l[0], "%m/%d/%y %H:%M")
-            if start_datetime <= date <= end_datetime:
-                m = BARCODE_REGEX.search(l[1])
-                if m:
-                    barcode = m.group(1)
-                    if barcode in scan_count:
-                        scan_count[barcode] += 1
-                    else:
-                        scan_count[barcode] = 1
+    hourly = [0] * 24
+    daily = {}
+    for chunk in chunks:
+        for line in chunk.splitlines(keepends=True):
+            date, barcode = parse_line(line)
+            if barcode is not None and start_datetime <= date <= end_datetime:
+                if barcode in scan_count:
+                    scan_count[barcode] += 1
+                else:
+                    scan_count[barcode] = 1
+                hourly[date.hour] += 1
+                daily[date.date()] = daily.get(date.date(), 0) + 1
+    return scan_count, hourly, daily
+
+
+def minute_key(date):
+    return (
+        date.year * 10**8
+        + date.month * 10**6
+        + date.day * 10**4
+        + date.hour * 100
+        + date.minute
+    )
+
 
+def aggregate_chunks(chunks, start_datetime, end_datetime):
+    """
+    Count scans per standard, hour of day and day with vectorized NumPy operations.
+    Timestamps of well-formed lines are parsed as integer arrays; the barcode regex
+    only runs once per distinct barcode field. Other lines go through parse_line,
+    so the result is the same as aggregate_lines.
+    """
+    # scans are logged at minute resolution
+    start = start_datetime.replace(second=0, microsecond=0)
+    if start < start_datetime:
+        start += dt.timedelta(minutes=1)
+    start_key, end_key = minute_key(start), minute_key(end_datetime)
+
+    standards = []
+    codes_by_standard = {}
+
+    def code(barcode):
+        if barcode is None:
+            return -1
+        if barcode not in codes_by_standard:
+            codes_by_standard[barcode] = len(standards)
+            standards.append(barcode)
+        return codes_by_standard[barcode]
+
+    scan_count = {}
+    hourly = np.zeros(24, dtype=np.int64)
+    daily = {}
+    for chunk in chunks:
+        buf = np.frombuffer(chunk + bytes(TAIL_BYTES + TIMESTAMP_BYTES), np.uint8)
+        ends = np.flatnonzero(buf[: len(chunk)] == ord("\n"))
+        starts = np.concatenate(([0], ends[:-1] + 1))
+
+        # "MM/DD/YY HH:MM," at the start of the line
+        digits = buf[starts[:, None] + TIMESTAMP_DIGITS].astype(np.int64) - ord("0")
+        well_formed = ((digits >= 0) & (digits <= 9)).all(axis=1) & (
+            ends - starts >= TIMESTAMP_BYTES
+        )
+        for offset, char in TIMESTAMP_SEPARATORS:
+            well_formed &= buf[starts + offset] == ord(char)
+        month, day, yy, hour, minute = (
+            digits[:, i] * 10 + digits[:, i + 1] for i in range(0, 10, 2)
+        )
+        year = yy + np.where(yy >= 69, 1900, 2000)  # strptime's %y pivot
+        leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+        month_days = DAYS_IN_MONTH[np.clip(month, 0, 12)] - ((month == 2) & ~leap)
+        well_formed &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_days)
+        well_formed &= (hour < 24) & (minute < 60)
+        keys = year * 10**8 + month * 10**6 + day * 10**4 + hour * 100 + minute
+        in_range = well_formed & (keys >= start_key) & (keys <= end_key)
+        day_keys = year * 10**4 + month * 100 + day
+
+        # the barcode field runs from the first comma to the next comma or newline
+        rows = np.flatnonzero(in_range)
+        tails = buf[(starts[rows] + TIMESTAMP_BYTES)[:, None] + np.arange(TAIL_BYTES)]
+        stops = (tails == ord(",")) | (tails == ord("\n"))
+        bounded = stops.any(axis=1)
+        tails[np.arange(TAIL_BYTES) >= stops.argmax(axis=1)[:, None]] = 0
+        # group equal fields by a hash of their bytes; rows that collide with a
+        # different field are rare and parsed one by one below
+        words = np.ascontiguousarray(tails).view(np.uint64)
+        hashes = np.zeros(len(rows), dtype=np.uint64)
+        for k in range(words.shape[1]):
+            hashes = (hashes ^ words[:, k]) * FIELD_HASH_MULTIPLIER
+        _, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        bounded &= (tails[first[inverse]] == tails).all(axis=1)
+        field_codes = np.array(
+            [code(parse_field(bytes(tails[i]).rstrip(b"\0"))) for i in first],
+            dtype=np.int64,
+        )
+        codes = np.full(len(starts), -1, dtype=np.int64)
+        codes[rows] = field_codes[inverse]
+
+        irregular = np.concatenate((np.flatnonzero(~well_formed), rows[~bounded]))
+        for i in irregular:
+            date, barcode = parse_line(chunk[starts[i] : ends[i] + 1])
+            in_range[i] = start_datetime <= date <= end_datetime
+            codes[i] = code(barcode)
+            hour[i] = date.hour
+            day_keys[i] = date.year * 10**4 + date.month * 100 + date.day
+
+        counted = np.flatnonzero(in_range & (codes >= 0))
+        found, first, counts = np.unique(
+            codes[counted], return_index=True, return_counts=True
+        )
+        # keep the order standards are first seen in, like the line by line count
+        for j in np.argsort(first, kind="stable"):
+            barcode = standards[found[j]]
+            scan_count[barcode] = scan_count.get(barcode, 0) + int(counts[j])
+        hourly += np.bincount(hour[counted], minlength=24)
+        found_days, day_counts = np.unique(day_keys[counted], return_counts=True)
+        for day_key, count in zip(found_days.tolist(), day_counts.tolist()):
+            date = dt.date(day_key // 10**4, day_key // 100 % 100, day_key % 100)
+            daily[date] = daily.get(date, 0) + count
+    return scan_count, hourly.tolist(), dict(sorted(daily.items()))
+
+
+def parse_field(field):
+    m = BARCODE_REGEX.search(field.decode())
+    return m.group(1) if m else None
+
+
+def write_scan_count(scan_count):
+    """
+    Write per-standard scan counts to the output file.
+    """
     with open(OUTPUT_FILE, "w") as f:
         for barcode, count in scan_count.items():
             f.write(f"{barcode},{count}\n")
 
 
+def write_histograms(hourly, daily):
+    """
+    Write the hourly and daily histograms of counted scans.
+    """
+    with open(HOURLY_OUTPUT_FILE, "w") as f:
+        for hour, count in enumerate(hourly):
+            f.write(f"{hour:02d},{count}\n")
+    with open(DAILY_OUTPUT_FILE, "w") as f:
+        for date, count in sorted(daily.items()):
+            f.write(f"{date.isoformat()},{count}\n")
+
+
+def get_scan_count_from_store(start_datetime, end_datetime, store_path=HISTORY_STORE):
+    """
+    Get the number of scans between two dates from a columnar history store.
+    Scans are compared at minute resolution, like the text log.
+    """
+    start = start_datetime.replace(second=0, microsecond=0)
+    if start < start_datetime:
+        start += dt.timedelta(minutes=1)
+    end = end_datetime.replace(second=0, microsecond=0) + dt.timedelta(minutes=1)
+    with ScanHistoryReader(store_path) as history:
+        scan_count = history.countStandards(toEpochMs(start), toEpochMs(end) - 1)
+    write_scan_count(scan_count)
+
+
+def get_scan_count_incremental(
+    paths=None, checkpoint_path=CHECKPOINT_FILE, histograms=False, workers=None
+):
+    """
+    Count every scan in the history files, reading only the lines appended since
+    the last run. The byte offset reached in each file, its identity and the
+    running counts and histograms are saved in a checkpoint file. Files are
+    recognized by device, inode and first bytes, so a rotated log keeps its
+    offset under its new name and its replacement is read from the start. If a
+    file was truncated or rewritten, every file is counted again from scratch.
+    """
+    files = expand_paths(paths or [HISTORY_FILE])
+    checkpoint = load_checkpoint(checkpoint_path)
+    tasks, entries = plan_increments(files, checkpoint)
+    if tasks is None:
+        print(f"History was rewritten, rebuilding {checkpoint_path}.")
+        checkpoint = None
+        tasks, entries = plan_increments(files, None)
+
+    count = functools.partial(
+        count_range, start_datetime=dt.datetime.min, end_datetime=dt.datetime.max
+    )
+    results = map_tasks(count, tasks, workers)
+    if checkpoint is None:
+        scan_count, hourly, daily = merge_counts(results)
+    else:
+        scan_count, hourly, daily = merge_counts(
+            results,
+            checkpoint["scan_count"],
+            checkpoint["hourly"],
+            {dt.date.fromisoformat(d): n for d, n in checkpoint["daily"].items()},
+        )
+
+    save_checkpoint(
+        checkpoint_path,
+        {
+            "files": entries,
+            "scan_count": scan_count,
+            "hourly": hourly,
+            "daily": {date.isoformat(): n for date, n in daily.items()},
+        },
+    )
+    write_scan_count(scan_count)
+    if histograms:
+        write_histograms(hourly, daily)
+    return scan_count, hourly, daily
+
+
+def plan_increments(files, checkpoint):
+    """
+    Byte ranges of `files` not yet counted in `checkpoint`, and the checkpoint
+    entries of the files after counting them. The ranges are None if a file
+    the checkpoint knows was truncated or rewritten.
+    """
+    known = {}
+    if checkpoint is not None:
+        known = {(e["device"], e["inode"]): e for e in checkpoint["files"]}
+    tasks = []
+    entries = []
+    for path in files:
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if any(
+                (e["device"], e["inode"]) == (st.st_dev, st.st_ino) for e in entries
+            ):
+                continue  # the same file matched twice
+            entry = known.get((st.st_dev, st.st_ino))
+            offset = 0
+            if entry is not None:
+                head = f.read(entry["head_bytes"])
+                if (
+                    hashlib.sha1(head).hexdigest() != entry["head"]
+                    or st.st_size < entry["offset"]
+                ):
+                    return None, None
+                offset = entry["offset"]
+            # leave a line that is still being written for the next run
+            stop = complete_lines_end(f, offset, st.st_size)
+            if stop > offset:
+                tasks.extend(split_range(f, path, offset, stop))
+            f.seek(0)
+            head = f.read(HEAD_BYTES)
+            entries.append(
+                {
+                    "path": path,
+                    "device": st.st_dev,
+                    "inode": st.st_ino,
+                    "head_bytes": len(head),
+                    "head": hashlib.sha1(head).hexdigest(),
+                    "offset": stop,
+                }
+            )
+    return tasks, entries
+
+
+def complete_lines_end(f, start, size):
+    """
+    Position just after the last newline between `start` and `size` in `f`.
+    """
+    position = size
+    while position > start:
+        block_start = max(start, position - CHUNK_BYTES)
+        f.seek(block_start)
+        newline = f.read(position - block_start).rfind(b"\n")
+        if newline >= 0:
+            return block_start + newline + 1
+        position = block_start
+    return start
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def convert_history(log_path=HISTORY_FILE, store_path=HISTORY_STORE):
+    """
+    Convert a text scan log into the columnar history store.
+    If the app already started the store, only log lines from before its first
+    scan are converted. The log also holds the scans the app stored, so lines
+    in the minute of the first stored scan are matched against the store's scans
+    in that minute. The converted scans are written to a new store, followed by
+    the scans already stored, and the new store then replaces the old one.
+    Run it with the app closed. Returns the number of scans converted.
+    """
+    new_path = store_path + ".new"
+    old_path = store_path + ".old"
+    if not os.path.exists(store_path) and os.path.isdir(new_path):
+        # an earlier run stopped between its two renames; finish the swap
+        os.replace(new_path, store_path)
+    shutil.rmtree(new_path, ignore_errors=True)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+    store = ScanHistoryStore(store_path)
+    stored = len(store)
+    store.close()
+    if not stored:
+        return _convert_log(log_path, store_path)
+
+    with ScanHistoryReader(store_path) as existing:
+        first_scan = dt.datetime.fromtimestamp(existing.timestamps[0] / 1000)
+        # the log has minute resolution, so its last lines of that minute are
+        # the scans the store holds from the same minute
+        first_minute = first_scan.replace(second=0, microsecond=0)
+        next_minute = first_minute + dt.timedelta(minutes=1)
+        first_minute_stored = len(
+            existing.rowRange(toEpochMs(first_minute), toEpochMs(next_minute) - 1)
+        )
+    converted = _convert_log(
+        log_path, new_path, first_minute, skip_last=first_minute_stored
+    )
+
+    store = ScanHistoryStore(new_path)
+    try:
+        with ScanHistoryReader(store_path) as existing:
+            for start in range(0, len(existing), CONVERT_CHUNK_LINES):
+                rows = slice(start, start + CONVERT_CHUNK_LINES)
+                store.append(
+                    [
+                        (
+                            timestamp_ms,
+                            existing.standard_ids[code] if code != NO_VALUE else None,
+                            expiry,
+                        )
+                        for timestamp_ms, code, expiry in zip(
+                            existing.timestamps[rows],
+                            existing.standards[rows],
+                            existing.expiries[rows],
+                        )
+                    ]
+                )
+            stored = len(existing)
+        store.append([], fsync=True)
+    finally:
+        store.close()
+
+    with ScanHistoryReader(store_path) as existing:
+        if len(existing) != stored:
+            shutil.rmtree(new_path)
+            raise RuntimeError(f"{store_path} changed during conversion, close the app")
+    os.replace(store_path, old_path)
+    os.replace(new_path, store_path)
+    shutil.rmtree(old_path)
+    return converted
+
+
+def _convert_log(log_path, store_path, last_minute=None, skip_last=0):
+    """Append the scans of a text scan log to a store. If `last_minute` is given,
+    only scans logged up to that minute are appended, leaving out the last
+    `skip_last` lines of that minute. Returns the number of scans appended."""
+    store = ScanHistoryStore(store_path)
+    scans = []
+    last_minute_scans = []
+    converted = 0
+    try:
+        with open(log_path, "r") as f:
+            for line in f:
+                l = line.split(",")
+                date = dt.datetime.strptime(l[0], LOG_DATE_FORMAT)
+                if last_minute is not None and date >= last_minute:
+                    if date == last_minute:
+                        last_minute_scans.append(_log_scan(date, l[1]))
+                    continue
+                scans.append(_log_scan(date, l[1]))
+                if len(scans) >= CONVERT_CHUNK_LINES:
+                    store.append(scans)
+                    converted += len(scans)
+                    scans = []
+        scans += last_minute_scans[: max(len(last_minute_scans) - skip_last, 0)]
+        store.append(scans, fsync=True)
+        converted += len(scans)
+    finally:
+        store.close()
+    return converted
+
+
+def _log_scan(date, barcode):
+    """Store record of a scan log line."""
+    m = BARCODE_REGEX.search(barcode)
+    if m:
+        return (toEpochMs(date), m.group(1), packExpiry(m.group(2)))
+    return (toEpochMs(date), None, packExpiry(None))
+
+
 if __name__ == "__main__":
-    start_datetime = dt.datetime.strptime("10/26/21 04:50", "%m/%d/%y %H:%M")
-    end_datetime = dt.datetime.now()
-    get_scan_count(start_datetime, end_datetime)
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        help=f"history files, globs or directories (default {HISTORY_FILE})",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"count all scans, reading only lines added since {CHECKPOINT_FILE}",
+    )
+    parser.add_argument(
+        "--workers", type=int, help="worker processes (default: one per core)"
+    )
+    parser.add_argument(
+        "--convert",
+        action="store_true",
+        help=f"convert {HISTORY_FILE} into the {HISTORY_STORE} store and exit",
+    )
+    parser.add_argument(
+        "--store", action="store_true", help=f"count scans from {HISTORY_STORE}"
+    )
+    parser.add_argument(
+        "--histograms",
+        action="store_true",
+        help=f"also write {HOURLY_OUTPUT_FILE} and {DAILY_OUTPUT_FILE}",
+    )
+    args = parser.parse_args()
+
+    if args.convert:
+        print(f"Converted {convert_history()} scans.")
+    elif args.incremental:
+        get_scan_count_incremental(
+            paths=args.paths, histograms=args.histograms, workers=args.workers
+        )
+    else:
+        start_datetime = dt.datetime.strptime("10/26/21 04:50", LOG_DATE_FORMAT)
+        end_datetime = dt.datetime.now()
+        if args.store:
+            get_scan_count_from_store(start_datetime, end_datetime)
+        else:
+            get_scan_count(
+                start_datetime,
+                end_datetime,
+                histograms=args.histograms,
+                paths=args.paths,
+                workers=args.workers,
+            )